@@ -0,0 +1,139 @@
+"""Render quotations for many clients from a CSV or JSON batch into a ZIP.
+
+    python batch_quotes.py clients.csv -o quotations.zip -j 8
+
+CSV input has one row per load item (client columns repeated on each row;
+consecutive rows with the same quote_id, or client_name if there is no
+quote_id column, form one quote). Optional columns named after any of
+quotation.DEFAULT_SETTINGS override the sizing defaults.
+
+JSON input is a list of objects with the client fields, a "loads" list of
+{appliance, watt, quantity, hours} and optional settings keys.
+"""
+import argparse
+import csv
+import datetime
+import io
+import itertools
+import json
+import math
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from quotation import CLIENT_FIELDS, DEFAULT_SETTINGS, load_item, prepare_quote, build_quotation_pdf
+
+
+def _number(cast, value):
+    # Checked before casting: int(float("inf")) raises OverflowError, not ValueError
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"Not a finite number: {value!r}")
+    return cast(number)
+
+
+def _setting(name, value):
+    default = DEFAULT_SETTINGS[name]
+    return _number(type(default), value) if isinstance(default, (int, float)) else value
+
+
+def parse_job(record, loads=None):
+    """Job for one client record; `loads` defaults to the record's "loads" list (the JSON format)."""
+    loads = record.get("loads", []) if loads is None else loads
+    return {
+        "client": {field: record.get(field) or "" for field in CLIENT_FIELDS},
+        "settings": {k: _setting(k, v) for k, v in record.items() if k in DEFAULT_SETTINGS and v not in ("", None)},
+        "loads": [load_item(l["appliance"], _number(float, l["watt"]), _number(int, l["quantity"]),
+                            _number(float, l["hours"])) for l in loads],
+    }
+
+
+def read_jobs(path, f=None):
+    """Yield one job per client without reading the whole batch into memory (CSV).
+
+    `f` is an already-open binary file holding `path`'s contents, e.g. an upload.
+    """
+    if f is None:
+        with open(path, "rb") as f:
+            yield from read_jobs(path, f)
+        return
+    text = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    try:
+        if path.lower().endswith(".json"):
+            for record in json.load(text):
+                yield parse_job(record)
+            return
+        reader = csv.DictReader(text)
+        key = "quote_id" if "quote_id" in (reader.fieldnames or ()) else "client_name"
+        for _, rows in itertools.groupby(reader, key=lambda row: row[key]):
+            rows = list(rows)
+            yield parse_job(rows[0], rows)
+    finally:
+        text.detach()
+
+
+def render_job(seq, job, issued):
+    quote = prepare_quote(job["client"], job["loads"], job["settings"])
+    quote["date"] = issued
+    quote["quote_reference"] = f"ANNUR-{issued.strftime('%Y%m%d')}-{seq:03d}"
+    name = quote["client_name"].replace(" ", "_") or "client"
+    filename = f"AnnurTech_Quotation_{name}_{issued.strftime('%Y%m%d')}_{seq:04d}.pdf"
+    return filename, build_quotation_pdf(quote).getvalue()
+
+
+def run(jobs, output, workers=None, log=sys.stderr):
+    """Render `jobs` in a process pool, writing each PDF to the ZIP as soon as it is done.
+
+    At most two PDFs per worker are in flight, so memory stays flat however
+    large the batch is. Returns (rendered, failed, seconds).
+    """
+    workers = workers or os.cpu_count() or 1
+    issued = datetime.datetime.now()
+    rendered = failed = 0
+    start = time.perf_counter()
+
+    def collect(done):
+        nonlocal rendered, failed
+        for future in done:
+            seq = futures.pop(future)
+            try:
+                filename, pdf = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"Quote #{seq} failed: {exc!r}", file=log)
+                continue
+            archive.writestr(filename, pdf)
+            rendered += 1
+
+    with ProcessPoolExecutor(workers) as pool, \
+            zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        futures = {}
+        for seq, job in enumerate(jobs, start=1):
+            futures[pool.submit(render_job, seq, job, issued)] = seq
+            if len(futures) >= 2 * workers:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(list(futures))
+
+    return rendered, failed, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Annur Tech quotations in bulk.")
+    parser.add_argument("input", help="CSV or JSON batch file")
+    parser.add_argument("-o", "--output", default="quotations.zip", help="ZIP file to write")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    rendered, failed, seconds = run(read_jobs(args.input), args.output, args.workers)
+    rate = rendered / seconds if seconds else 0.0
+    print(f"Rendered {rendered} quotations in {seconds:.1f} s ({rate:.1f} PDFs/s) -> {args.output}")
+    if failed:
+        print(f"{failed} quotations failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Benchmark sizing throughput, app reruns and PDF rendering against a saved baseline.
+
+    python benchmark.py                  # run everything, compare with the baseline
+    python benchmark.py --save           # run and store the results as the new baseline
+    python benchmark.py --only pdf,rerun --threshold 0.1
+
+Results are compared with data/benchmark_baseline.json (written by --save on
+the machine being measured); any result more than --threshold worse than its
+baseline is reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from catalog import current_catalog
+from quotation import build_quotation_pdf, load_item, prepare_quote
+from sizing import financials, size_systems
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "solar_app.py")
+BASELINE_PATH = os.path.join(HERE, "data", "benchmark_baseline.json")
+
+LOAD_SIZES = (1, 50, 500)
+SCALAR_QUOTES = 2000
+BATCH_SITES = 200_000
+RERUNS = 5
+PDF_REPEATS = 5
+THRESHOLD = 0.2
+
+
+def _median_seconds(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _load_items(n, seed=0):
+    rng = np.random.default_rng(seed)
+    names = list(current_catalog().appliances.items())
+    return [load_item(*names[i % len(names)], int(rng.integers(1, 5)), float(rng.integers(1, 13)))
+            for i in range(n)]
+
+
+def bench_sizing():
+    """Quotes per second, one prepare_quote() call each vs. one vectorized size_systems() pass."""
+    catalog = current_catalog()
+    loads = [_load_items(int(n), seed) for seed, n in enumerate(np.random.default_rng(1).integers(1, 20, 50))]
+    client = {"client_name": "Benchmark", "project_location": "Lagos"}
+
+    def scalar():
+        for i in range(SCALAR_QUOTES):
+            prepare_quote(client, loads[i % len(loads)], catalog=catalog)
+
+    rng = np.random.default_rng(2)
+    battery, panel, inverter = (next(iter(c.values())) for c in (catalog.batteries, catalog.panels, catalog.inverters))
+    total_wh = rng.uniform(500, 50_000, BATCH_SITES)
+    total_watt = rng.uniform(100, 10_000, BATCH_SITES)
+
+    def batched():
+        sized = size_systems(total_wh, total_watt, 5, 24, 80, 90, 5.0, 75, battery["capacity"], battery["price"],
+                             panel["vmp"], panel["price"], inverter["price"])
+        financials(total_wh, sized["total_cost"], 50, 10)
+
+    return {
+        "sizing_scalar_quotes_per_s": (SCALAR_QUOTES / _median_seconds(scalar, 3), "quotes/s", True),
+        "sizing_batched_sites_per_s": (BATCH_SITES / _median_seconds(batched, 5), "sites/s", True),
+    }
+
+
+def bench_rerun():
+    """Full-script run time in the headless app-testing harness, per load list size."""
+    from streamlit.testing.v1 import AppTest
+    from load_store import LoadStore
+
+    def app(items):
+        at = AppTest.from_file(APP, default_timeout=300)
+        at.session_state["load_data"] = LoadStore(items)
+        return at
+
+    app(_load_items(1)).run()  # warm-up: imports and process-wide caches shared by every size
+    results = {}
+    for n in LOAD_SIZES:
+        at = app(_load_items(n, seed=n))
+        start = time.perf_counter()
+        at.run()
+        results[f"rerun_first_{n}_items_ms"] = ((time.perf_counter() - start) * 1000, "ms", False)
+        results[f"rerun_{n}_items_ms"] = (_median_seconds(at.run, RERUNS) * 1000, "ms", False)
+        if at.exception:
+            raise RuntimeError(f"App raised with {n} load items: {at.exception[0].message}")
+    return results
+
+
+def bench_pdf():
+    """Quotation PDF render time and peak Python heap (tracemalloc), per load list size."""
+    build_quotation_pdf(prepare_quote({"client_name": "Benchmark"}, _load_items(1)))  # warm-up: reportlab import
+    results = {}
+    for n in LOAD_SIZES:
+        quote = prepare_quote({"client_name": "Benchmark", "project_location": "Lagos"}, _load_items(n, seed=n))
+        results[f"pdf_{n}_items_ms"] = (_median_seconds(lambda: build_quotation_pdf(quote), PDF_REPEATS) * 1000,
+                                        "ms", False)
+        # A separate pass, since tracing allocations slows rendering down
+        tracemalloc.start()
+        build_quotation_pdf(quote)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[f"pdf_{n}_items_peak_mb"] = (peak / 2 ** 20, "MB", False)
+    return results
+
+
+BENCHMARKS = {"sizing": bench_sizing, "rerun": bench_rerun, "pdf": bench_pdf}
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Names of results more than `threshold` (a fraction) worse than their baseline."""
+    regressions = []
+    for name, (value, _, higher_is_better) in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["value"]
+        if not base:
+            continue
+        change = (base - value) / base if higher_is_better else (value - base) / base
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark sizing, app reruns and PDF rendering.")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated subset of: "
+                        + ", ".join(BENCHMARKS))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results file")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="fraction worse than baseline that counts as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.only.split(","):
+        results.update(BENCHMARKS[name.strip()]())
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for name, (value, unit, _) in results.items():
+        base = baseline.get(name, {}).get("value")
+        against = f"  (baseline {base:,.1f}, {value / base - 1:+.0%})" if base else ""
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:32} {value:14,.1f} {unit:8}{against}{flag}")
+
+    if args.save:
+        baseline.update({name: {"value": value, "unit": unit, "higher_is_better": better}
+                         for name, (value, unit, better) in results.items()})
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} result(s) more than {args.threshold:.0%} worse than baseline", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
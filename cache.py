@@ -0,0 +1,88 @@
+import functools
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Process-wide cache for values the app rebuilds on every Streamlit rerun
+# (tables, figures, simulations). Entries are keyed by section name plus the
+# contents of the inputs (or their cache_key(), for stores that track their
+# own version), shared by all sessions, and evicted least recently
+# used first. Cached values are shared, so callers must treat them as
+# read-only.
+
+CACHE_SIZE = 256
+
+
+def freeze(value):
+    """Hashable, content-based stand-in for `value`."""
+    if hasattr(value, "cache_key"):
+        return value.cache_key()
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.dtype.str, value.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class RerunCache:
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+
+    def get(self, section, key, compute):
+        """Return the cached value for (section, key), computing it on a miss."""
+        full_key = (section, key)
+        with self._lock:
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits[section] += 1
+                return self._entries[full_key]
+            self.misses[section] += 1
+        value = compute()
+        with self._lock:
+            self._entries[full_key] = value
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def memoize(self, section):
+        """Decorator caching a function on the contents of its arguments."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (freeze(args), freeze(kwargs))
+                return self.get(section, key, lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """One row per section with hits, misses and hit rate."""
+        with self._lock:
+            sections = sorted(set(self.hits) | set(self.misses))
+            return [
+                {
+                    "section": name,
+                    "hits": self.hits[name],
+                    "misses": self.misses[name],
+                    "hit_rate": self.hits[name] / (self.hits[name] + self.misses[name]),
+                }
+                for name in sections
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+rerun_cache = RerunCache()
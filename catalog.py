@@ -0,0 +1,200 @@
+import csv
+import datetime
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+# Nigerian-specific component database with current market prices (Naira).
+#
+# Components live in a data file (CSV, or Parquet when pyarrow is installed)
+# so prices can change without a redeploy. The file is parsed once into an
+# immutable Catalog snapshot shared by every session; current_catalog() checks
+# the file's mtime at most every RELOAD_INTERVAL seconds and swaps in a new
+# snapshot when it changes. Every price change seen on reload is appended to a
+# price history file so older quotes can be repriced.
+
+CATALOG_PATH = os.environ.get("SOLAR_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             "data", "catalog.csv"))
+RELOAD_INTERVAL = 2.0  # seconds between mtime checks
+
+# Fields kept for each category, with their types. A controller's voltage is
+# the highest battery voltage it charges; current is its rated charge current.
+FIELDS = {
+    "panel": {"price": int, "power": int, "vmp": float, "voc": float, "isc": float, "efficiency": float,
+              "warranty": str},
+    "battery": {"price": int, "capacity": int, "type": str, "voltage": int, "life_cycles": int},
+    "inverter": {"price": int, "power": int, "voltage": int, "type": str, "warranty": str},
+    "controller": {"price": int, "voltage": int, "max_voc": float, "mppt_min": float, "mppt_max": float,
+                   "current": int, "max_pv_current": float, "type": str, "warranty": str},
+}
+
+SYSTEM_VOLTAGES = (12, 24, 48)
+
+PROJECT_LOCATIONS = ["Abuja", "Lagos", "Kano", "Port Harcourt", "Kaduna", "Other"]
+
+
+def _history_path(path):
+    return os.path.join(os.path.dirname(path), "price_history.csv")
+
+
+def _read_table(path):
+    # Rows as dicts; the CSV path avoids importing pandas on a cold start
+    if path.lower().endswith(".parquet"):
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def _present(value):
+    return value is not None and value != "" and not (isinstance(value, float) and math.isnan(value))
+
+
+def _cast(cast, value):
+    return int(float(value)) if cast is int else cast(value)
+
+
+class Catalog:
+    """Immutable snapshot of the component catalog with lookup indexes."""
+
+    def __init__(self, table, history, version):
+        self.version = version
+        self.components = {}
+        for category, fields in FIELDS.items():
+            self.components[category] = {
+                row["name"]: {f: _cast(cast, row[f]) for f, cast in fields.items() if _present(row.get(f))}
+                for row in table if row["category"] == category
+            }
+        self.appliances = {row["name"]: _cast(int, row["watt"]) for row in table if row["category"] == "appliance"}
+        # Appliance name -> group (Cooling, Lighting, ...) for the load charts
+        self.appliance_groups = {row["name"]: row["type"] for row in table
+                                 if row["category"] == "appliance" and _present(row.get("type"))}
+        self._history = history
+        self._sorted = {}
+        self._lock = threading.Lock()
+
+    @property
+    def panels(self):
+        return self.components["panel"]
+
+    @property
+    def batteries(self):
+        return self.components["battery"]
+
+    @property
+    def inverters(self):
+        return self.components["inverter"]
+
+    @property
+    def controllers(self):
+        return self.components["controller"]
+
+    def _range_index(self, category, field):
+        # Built on first use: names ordered by the field, for searchsorted range queries
+        key = (category, field)
+        with self._lock:
+            if key not in self._sorted:
+                items = [(spec[field], name) for name, spec in self.components[category].items() if field in spec]
+                items.sort()
+                self._sorted[key] = (np.array([v for v, _ in items], dtype=np.float64),
+                                     np.array([n for _, n in items], dtype=object))
+            return self._sorted[key]
+
+    def find(self, category, **criteria):
+        """Components in `category` matching every criterion.
+
+        A (low, high) tuple selects an inclusive range, e.g. price=(50000, 150000)
+        or power=(3000, None); any other value must match exactly, e.g.
+        type="Lithium" or voltage=48.
+        """
+        names = None
+        for field, wanted in criteria.items():
+            if isinstance(wanted, tuple):
+                values, ordered = self._range_index(category, field)
+                low, high = wanted
+                start = 0 if low is None else np.searchsorted(values, low, side="left")
+                stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+                matched = set(ordered[start:stop])
+            else:
+                matched = {name for name, spec in self.components[category].items() if spec.get(field) == wanted}
+            names = matched if names is None else names & matched
+        specs = self.components[category]
+        return {name: specs[name] for name in specs if names is None or name in names}
+
+    def price_on(self, name, date):
+        """Price of a component on `date`, from the price history (None if unknown)."""
+        dates, prices = self._history.get(name, ((), ()))
+        i = bisect_right(dates, date.isoformat()[:10])
+        return prices[i - 1] if i else None
+
+    def reprice(self, bom, date=None):
+        """Copy of a bill of materials at prices from `date` (default: current prices)."""
+        current = {name: spec["price"] for specs in self.components.values() for name, spec in specs.items()}
+        repriced = []
+        for line in bom:
+            price = current.get(line["component"]) if date is None else self.price_on(line["component"], date)
+            repriced.append(dict(line, unit_price=line["unit_price"] if price is None else price))
+        return repriced
+
+    def cache_key(self):
+        return ("Catalog", self.version)
+
+
+def _load_history(path, table, stamp):
+    # name -> (sorted dates, prices); append a row for every price that differs from the last recorded one
+    history_path = _history_path(path)
+    history = {}
+    if os.path.exists(history_path):
+        with open(history_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                dates, prices = history.setdefault(row["name"], ([], []))
+                dates.append(row["date"])
+                prices.append(_cast(int, row["price"]))
+    changes = []
+    for row in table:
+        if not _present(row.get("price")):
+            continue
+        price = _cast(int, row["price"])
+        dates, prices = history.setdefault(row["name"], ([], []))
+        if not prices or prices[-1] != price:
+            dates.append(stamp)
+            prices.append(price)
+            changes.append((stamp, row["category"], row["name"], price))
+    if changes:
+        try:
+            new_file = not os.path.exists(history_path)
+            with open(history_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["date", "category", "name", "price"])
+                writer.writerows(changes)
+        except OSError:
+            pass  # read-only deployment: history stays in memory
+    return history
+
+
+_states = {}  # path -> {"catalog", "mtime", "checked"}
+_state_lock = threading.Lock()
+
+
+def current_catalog(path=CATALOG_PATH):
+    """The latest catalog snapshot, reparsed only when the data file changes."""
+    now = time.monotonic()
+    state = _states.get(path)
+    if state is not None and now - state["checked"] < RELOAD_INTERVAL:
+        return state["catalog"]
+    with _state_lock:
+        state = _states.setdefault(path, {"catalog": None, "mtime": None, "checked": 0.0})
+        mtime = os.stat(path).st_mtime_ns
+        state["checked"] = now
+        if state["catalog"] is None or mtime != state["mtime"]:
+            table = _read_table(path)
+            stamp = datetime.date.fromtimestamp(mtime / 1e9).isoformat()
+            version = 1 if state["catalog"] is None else state["catalog"].version + 1
+            state["catalog"] = Catalog(table, _load_history(path, table, stamp), version)
+            state["mtime"] = mtime
+        return state["catalog"]
@@ -0,0 +1,75 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Figures for the app whose size does not grow with the data behind them.
+#
+# Everything is reduced on the server before a trace is built: categorical
+# charts show the TOP_N largest entries and fold the rest into one "Other"
+# entry, and time series are cut to at most MAX_POINTS points by keeping the
+# minimum and maximum of each bucket, so peaks and troughs survive. Series
+# that still carry more than WEBGL_POINTS points are drawn as WebGL traces,
+# which the browser renders far faster than SVG.
+
+TOP_N = 10
+MAX_POINTS = 2000  # per time series
+WEBGL_POINTS = 1000
+COLOR = "#008751"
+
+
+def top_n(labels, values, n=TOP_N, other="Other"):
+    """Totals of `values` per label, largest first, with everything after the n-th folded into "Other (k)"."""
+    names, inverse = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=np.asarray(values, dtype=np.float64), minlength=len(names))
+    order = np.argsort(-totals, kind="stable")
+    names, totals = names[order].tolist(), totals[order]
+    if len(names) > n:
+        names = names[:n] + [f"{other} ({len(names) - n})"]
+        totals = np.append(totals[:n], totals[n:].sum())
+    return names, totals
+
+
+def downsample(x, y, max_points=MAX_POINTS):
+    """At most `max_points` points of the series, keeping the lowest and highest point of each bucket."""
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    size = -(-n // max(max_points // 2, 1))  # points per bucket
+    buckets = -(-n // size)
+    pad = buckets * size - n
+    offsets = np.arange(buckets) * size
+    low = np.pad(y, (0, pad), constant_values=np.inf).reshape(buckets, size).argmin(axis=1) + offsets
+    high = np.pad(y, (0, pad), constant_values=-np.inf).reshape(buckets, size).argmax(axis=1) + offsets
+    keep = np.unique(np.concatenate((low, high)))
+    return x[keep], y[keep]
+
+
+def line_trace(x, y, name=None, **kwargs):
+    """Downsampled line trace, WebGL when it is still large."""
+    x, y = downsample(x, y)
+    trace = go.Scattergl if len(y) > WEBGL_POINTS else go.Scatter
+    return trace(x=x, y=y, name=name, mode="lines", **kwargs)
+
+
+def line_chart(x, series, title, xaxis_title=None, yaxis_title=None):
+    """One line per entry of `series` (name -> y values), all over the same `x`."""
+    fig = go.Figure([line_trace(x, y, name) for name, y in series.items()])
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title,
+                      showlegend=len(series) > 1)
+    return fig
+
+
+def pie_chart(labels, values, title, n=TOP_N):
+    """Pie of the n largest label totals plus one slice for the rest."""
+    names, totals = top_n(labels, values, n)
+    fig = go.Figure(go.Pie(labels=names, values=totals, sort=False))
+    fig.update_layout(title=title)
+    return fig
+
+
+def bar_chart(labels, values, title, n=TOP_N, xaxis_title=None, yaxis_title=None):
+    """Bars for the n largest label totals plus one bar for the rest."""
+    names, totals = top_n(labels, values, n)
+    fig = go.Figure(go.Bar(x=names, y=totals, marker_color=COLOR))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title)
+    return fig
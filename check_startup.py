@@ -0,0 +1,61 @@
+"""Check that a fresh Streamlit session still starts fast.
+
+    python check_startup.py [--budget 1.0] [--runs 3]
+
+Runs the app once, headless, in a fresh interpreter (so nothing is already
+imported) and fails if the first script run takes longer than the budget or
+pulls in a module that should only load when a feature is used.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solar_app.py")
+
+FIRST_RUN_BUDGET = 1.0  # seconds for the first script run, after streamlit itself is imported
+# Loaded on demand by the load charts, meter import, expanders and PDF rendering
+DEFERRED_MODULES = ("pandas", "plotly.express", "reportlab", "pyarrow", "meter_import")
+
+_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+at.run()
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "exceptions": [e.message for e in at.exception],
+                  "loaded": [m for m in json.loads(sys.argv[2]) if m in sys.modules]}))
+"""
+
+
+def measure(app=APP):
+    """First-run time and deferred modules loaded, from one fresh interpreter."""
+    result = subprocess.run([sys.executable, "-c", _PROBE, app, json.dumps(DEFERRED_MODULES)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the app's cold-start time and deferred imports.")
+    parser.add_argument("--budget", type=float, default=FIRST_RUN_BUDGET, help="first-run budget in seconds")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters to measure (the fastest counts)")
+    args = parser.parse_args(argv)
+
+    results = [measure() for _ in range(args.runs)]
+    fastest = min(results, key=lambda r: r["seconds"])
+    print(f"First run {fastest['seconds']:.3f} s (budget {args.budget:.3f} s) over {args.runs} fresh interpreters")
+    problems = [f"script raised: {message}" for r in results for message in r["exceptions"]]
+    if fastest["seconds"] > args.budget:
+        problems.append(f"first run {fastest['seconds']:.3f} s is over the {args.budget:.3f} s budget")
+    loaded = sorted({m for r in results for m in r["loaded"]})
+    if loaded:
+        problems.append(f"imported at startup: {', '.join(loaded)}")
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+import calendar
+import functools
+import glob
+import json
+import os
+
+import numpy as np
+
+from catalog import PROJECT_LOCATIONS
+
+# Per-location climate from typical-meteorological-year (TMY) weather files.
+#
+# Drop one hourly TMY file per project location into data/weather, named after
+# the location (e.g. "Port Harcourt.csv" or "port_harcourt.epw"). PVGIS TMY
+# CSV exports and EnergyPlus EPW files are understood. The raw files are
+# parsed once into float32 .npy arrays under data/weather/cache, rebuilt only
+# when a raw file is added, removed or modified; every process then opens the
+# arrays memory-mapped, so a lookup is a slice rather than a parse.
+
+WEATHER_DIR = os.environ.get("SOLAR_WEATHER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "data", "weather"))
+CACHE_FORMAT = 1
+
+HOURS = 8760
+UTC_OFFSET = 1  # West Africa Time; PVGIS timestamps are UTC
+NOCT = 45.0  # nominal operating cell temperature (°C)
+POWER_TEMP_COEFF = 0.004  # module power loss per °C of cell temperature above 25 °C
+
+# Hourly columns and per-month summary columns (month rows 0-11, row 12 is the whole year)
+HOURLY_FIELDS = ("ghi", "temp_air")
+MONTHLY_FIELDS = ("sun_hours", "temp_air", "temperature_factor")
+ANNUAL = 12
+
+# Ranges of the app's sizing sliders; climate-derived design inputs are clamped to them
+SUN_HOURS_RANGE = (3.0, 8.0)
+TEMPERATURE_FACTOR_RANGE = (80, 100)
+
+_MONTH = np.repeat(np.arange(12), [calendar.monthrange(2019, m)[1] * 24 for m in range(1, 13)])
+
+
+def _location_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0].replace("_", " ").replace("-", " ").lower()
+    return next((loc for loc in PROJECT_LOCATIONS if loc.lower() == stem), None)
+
+
+def _read_pvgis(path):
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith("time(UTC)"))
+    header = lines[start].split(",")
+    rows = [line.split(",") for line in lines[start + 1:start + 1 + HOURS]]
+    ghi = np.array([float(r[header.index("G(h)")]) for r in rows])
+    temp = np.array([float(r[header.index("T2m")]) for r in rows])
+    # Shift from UTC to local time so hour-of-day lines up with the load profile
+    return np.roll(ghi, UTC_OFFSET), np.roll(temp, UTC_OFFSET)
+
+
+def _read_epw(path):
+    # EPW: 8 header lines, then hourly rows in local standard time (dry bulb is field 6, GHI field 13)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        rows = [line.split(",") for line in f.read().splitlines()[8:8 + HOURS]]
+    return np.array([float(r[13]) for r in rows]), np.array([float(r[6]) for r in rows])
+
+
+def _summarize(ghi, temp):
+    # Irradiance-weighted module temperature derating, per month and for the year
+    cell_temp = temp + ghi * (NOCT - 20.0) / 800.0
+    derate = 1.0 - POWER_TEMP_COEFF * np.maximum(cell_temp - 25.0, 0.0)
+    summary = np.empty((13, len(MONTHLY_FIELDS)))
+    for month in range(13):
+        hours = slice(None) if month == ANNUAL else _MONTH == month
+        g = ghi[hours]
+        days = g.size / 24
+        summary[month] = (g.sum() / 1000.0 / days, temp[hours].mean(),
+                          100.0 * (derate[hours] * g).sum() / g.sum() if g.sum() else 100.0)
+    return summary
+
+
+def _sources(weather_dir):
+    paths = sorted(glob.glob(os.path.join(weather_dir, "*.csv")) + glob.glob(os.path.join(weather_dir, "*.epw")))
+    return {os.path.basename(p): os.stat(p).st_mtime_ns for p in paths if _location_name(p)}
+
+
+def build_cache(weather_dir=WEATHER_DIR):
+    """Parse the raw weather files into the memory-mapped cache and return its index."""
+    sources = _sources(weather_dir)
+    locations, hourly, monthly = [], [], []
+    for name in sources:
+        path = os.path.join(weather_dir, name)
+        ghi, temp = (_read_epw if name.lower().endswith(".epw") else _read_pvgis)(path)
+        locations.append(_location_name(path))
+        hourly.append(np.stack([ghi, temp], axis=1))
+        monthly.append(_summarize(ghi, temp))
+
+    cache_dir = os.path.join(weather_dir, "cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    shape = (len(locations), HOURS, len(HOURLY_FIELDS))
+    # Write to temporary names and rename, so a concurrent reader never maps a half-written file
+    for filename, values in (("hourly.npy", np.array(hourly, dtype=np.float32).reshape(shape)),
+                             ("monthly.npy", np.array(monthly, dtype=np.float32).reshape(len(locations), 13, -1))):
+        np.save(os.path.join(cache_dir, f"{filename}.tmp.npy"), values)
+        os.replace(os.path.join(cache_dir, f"{filename}.tmp.npy"), os.path.join(cache_dir, filename))
+    index = {"format": CACHE_FORMAT, "locations": locations, "sources": sources}
+    with open(os.path.join(cache_dir, "index.json.tmp"), "w") as f:
+        json.dump(index, f)
+    os.replace(os.path.join(cache_dir, "index.json.tmp"), os.path.join(cache_dir, "index.json"))
+    return index
+
+
+class ClimateTable:
+    """Memory-mapped per-location hourly and monthly climate arrays."""
+
+    def __init__(self, weather_dir=WEATHER_DIR):
+        cache_dir = os.path.join(weather_dir, "cache")
+        sources = _sources(weather_dir) if os.path.isdir(weather_dir) else {}
+        if not sources:
+            self._rows, self._hourly, self._monthly = {}, None, None
+            return
+        index = None
+        try:
+            with open(os.path.join(cache_dir, "index.json")) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if index is None or index.get("format") != CACHE_FORMAT or index["sources"] != sources:
+            index = build_cache(weather_dir)
+        self._rows = {location: i for i, location in enumerate(index["locations"])}
+        self._hourly = np.load(os.path.join(cache_dir, "hourly.npy"), mmap_mode="r")
+        self._monthly = np.load(os.path.join(cache_dir, "monthly.npy"), mmap_mode="r")
+
+    @property
+    def locations(self):
+        return list(self._rows)
+
+    def __contains__(self, location):
+        return location in self._rows
+
+    def hourly(self, location):
+        """(8760, 2) read-only view of hourly GHI (W/m²) and air temperature (°C), local time."""
+        return self._hourly[self._rows[location]]
+
+    def monthly(self, location):
+        """(13, 3) read-only view of sun hours, air temperature and temperature factor; row 12 is the year."""
+        return self._monthly[self._rows[location]]
+
+    def design_inputs(self, location):
+        """Annual sun hours and temperature derating factor, within the sizing sliders' ranges."""
+        sun_hours, _, temperature_factor = self.monthly(location)[ANNUAL]
+        return {"sun_hours": min(max(round(float(sun_hours), 1), SUN_HOURS_RANGE[0]), SUN_HOURS_RANGE[1]),
+                "temperature_factor": min(max(int(round(float(temperature_factor))), TEMPERATURE_FACTOR_RANGE[0]),
+                                          TEMPERATURE_FACTOR_RANGE[1])}
+
+    def temperature_range(self, location):
+        """Coldest air temperature and hottest module temperature (°C) over the year."""
+        ghi, temp = self.hourly(location).T
+        return float(temp.min()), float((temp + ghi * (NOCT - 20.0) / 800.0).max())
+
+    def pv_yield(self, location, sun_hours=None):
+        """Hourly PV yield in Wh per W of array from the location's irradiance, optionally rescaled to `sun_hours`."""
+        ghi = self.hourly(location)[:, 0].astype(np.float64) / 1000.0
+        if sun_hours is not None:
+            ghi *= float(sun_hours) / (ghi.sum() / (HOURS / 24))
+        return ghi
+
+
+@functools.lru_cache(maxsize=None)
+def climate_table(weather_dir=WEATHER_DIR):
+    """Shared climate table per weather directory (empty when no weather files are installed)."""
+    return ClimateTable(weather_dir)
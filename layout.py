@@ -0,0 +1,108 @@
+import numpy as np
+
+from catalog import SYSTEM_VOLTAGES, current_catalog
+from sizing import CONTROLLER_MARGIN
+
+# Series/parallel string layouts for the PV array.
+#
+# A layout is `series` panels per string and `parallel` strings, split evenly
+# over one or more identical charge controllers. Every (panel, system voltage,
+# controller, series count) candidate is checked at once with array masks: the
+# series range is bounded first by the controller's voltage window, then the
+# smallest parallel count that meets the required array power is computed in
+# closed form (more strings only cost more), and the controller count follows
+# from its charge and input current limits.
+
+MIN_TEMP = 10.0  # coldest expected cell temperature (°C), raises Voc
+MAX_CELL_TEMP = 65.0  # hottest expected cell temperature (°C), lowers Vmp
+VOC_TEMP_COEFF = 0.0029  # per °C
+VMP_TEMP_COEFF = 0.0037  # per °C
+ISC_RATIO = 1.06  # typical Isc/Imp for crystalline modules, used when a panel has no isc
+CHARGE_RATIO = 1.2  # battery absorption voltage relative to nominal
+START_MARGIN = 5.0  # volts an MPPT needs above battery voltage to charge
+MAX_SERIES = 32
+
+
+def _column(components, field, default=np.nan):
+    return np.array([spec.get(field, default) for spec in components.values()], dtype=np.float64)
+
+
+def string_layouts(required_solar, panels=None, controllers=None, voltages=SYSTEM_VOLTAGES,
+                   min_temp=MIN_TEMP, max_cell_temp=MAX_CELL_TEMP):
+    """Cheapest valid layout for every panel and system voltage, cheapest first.
+
+    Cost covers the panels and controllers. Panel/voltage pairs with no valid
+    layout are left out.
+    """
+    if panels is None or controllers is None:
+        catalog = current_catalog()
+        panels = catalog.panels if panels is None else panels
+        controllers = catalog.controllers if controllers is None else controllers
+    if not panels or not controllers:
+        return []
+
+    # Axes: panel (P), voltage (V), controller (C), series count (S)
+    power, vmp, voc = (_column(panels, f)[:, None, None, None] for f in ("power", "vmp", "voc"))
+    isc = _column(panels, "isc")[:, None, None, None]
+    isc = np.where(np.isnan(isc), power / vmp * ISC_RATIO, isc)
+    panel_price = _column(panels, "price")[:, None, None, None]
+    volts = np.asarray(voltages, dtype=np.float64)[None, :, None, None]
+    max_voc, mppt_max, current = (_column(controllers, f)[None, None, :, None]
+                                  for f in ("max_voc", "mppt_max", "current"))
+    mppt_min = _column(controllers, "mppt_min", 0.0)[None, None, :, None]
+    max_pv_current = _column(controllers, "max_pv_current", np.inf)[None, None, :, None]
+    controller_volts = _column(controllers, "voltage")[None, None, :, None]
+    controller_price = _column(controllers, "price")[None, None, :, None]
+
+    # Voltage window: cold open-circuit voltage under the controller limit, hot MPP voltage
+    # far enough above the battery to charge
+    voc_cold = voc * (1 + VOC_TEMP_COEFF * (25.0 - min_temp))
+    vmp_hot = vmp * (1 - VMP_TEMP_COEFF * (max_cell_temp - 25.0))
+    s_max = np.minimum(np.floor(max_voc / voc_cold), np.floor(mppt_max / vmp))
+    s_min = np.ceil(np.maximum(mppt_min, volts * CHARGE_RATIO + START_MARGIN) / vmp_hot)
+    s_min = np.maximum(s_min, 1)
+    s_top = int(np.clip(np.nanmax(np.where(controller_volts >= volts, s_max, 0)), 0, MAX_SERIES))
+    if s_top < 1:
+        return []
+    series = np.arange(1, s_top + 1, dtype=np.float64)[None, None, None, :]
+    valid = (series >= s_min) & (series <= s_max) & (controller_volts >= volts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        parallel = np.maximum(np.ceil(float(required_solar) / (series * power)), 1)
+        # Strings one controller can take: input current and charge current limits
+        per_controller = np.minimum(np.floor(max_pv_current / isc),
+                                    np.floor(current * volts / (CONTROLLER_MARGIN * series * power)))
+        valid &= per_controller >= 1
+        count = np.ceil(parallel / per_controller)
+        cost = np.where(valid, series * parallel * panel_price + count * controller_price, np.inf)
+
+    cost = cost.reshape(cost.shape[0], cost.shape[1], -1)
+    best = cost.argmin(axis=2)
+    p_idx, v_idx = np.nonzero(np.isfinite(np.take_along_axis(cost, best[..., None], axis=2)[..., 0]))
+    c_idx, s_idx = np.unravel_index(best[p_idx, v_idx], (len(controllers), s_top))
+
+    panel_names, controller_names = list(panels), list(controllers)
+    layouts = []
+    for p, v, c, s in zip(p_idx, v_idx, c_idx, s_idx):
+        n_series, n_parallel = int(series[0, 0, 0, s]), int(parallel[p, 0, 0, s])
+        layouts.append({
+            "panel": panel_names[p],
+            "battery_voltage": int(volts[0, v, 0, 0]),
+            "series": n_series,
+            "parallel": n_parallel,
+            "num_panels": n_series * n_parallel,
+            "array_watts": float(n_series * n_parallel * power[p, 0, 0, 0]),
+            "controller": controller_names[c],
+            "num_controllers": int(count[p, v, c, s]),
+            "string_voc_cold": float(n_series * voc_cold[p, 0, 0, 0]),
+            "string_vmp_hot": float(n_series * vmp_hot[p, 0, 0, 0]),
+            "cost": float(cost[p, v, c * s_top + s]),
+        })
+    layouts.sort(key=lambda layout: layout["cost"])
+    return layouts
+
+
+def cheapest_layout(required_solar, battery_voltage, panel, **kwargs):
+    """Cheapest valid layout for one panel at one system voltage, or None."""
+    return next((layout for layout in string_layouts(required_solar, **kwargs)
+                 if layout["panel"] == panel and layout["battery_voltage"] == battery_voltage), None)
@@ -0,0 +1,146 @@
+import itertools
+
+import numpy as np
+
+# Columnar load list kept in session state. Each column is a preallocated
+# NumPy array that grows by doubling; appliance names are stored once and
+# referenced by integer code. total_watt and total_wh are running totals
+# updated on every add, edit and delete, so they never need a rescan.
+
+COLUMNS = ("appliance", "watt", "quantity", "total_watt", "hours", "wh")
+INITIAL_CAPACITY = 16
+
+_store_ids = itertools.count(1)
+
+
+class LoadStore:
+    def __init__(self, items=()):
+        self._uid = next(_store_ids)
+        self.version = 0
+        self._names = []
+        self._codes = {}
+        self._size = 0
+        self._alloc(INITIAL_CAPACITY)
+        self.total_watt = 0
+        self.total_wh = 0.0
+        for item in items:
+            self.add(item["appliance"], item["watt"], item["quantity"], item["hours"])
+
+    def _alloc(self, capacity):
+        old = getattr(self, "_cols", None)
+        self._cols = {
+            "appliance": np.zeros(capacity, dtype=np.int32),
+            "watt": np.zeros(capacity, dtype=np.float64),
+            "quantity": np.zeros(capacity, dtype=np.int32),
+            "total_watt": np.zeros(capacity, dtype=np.float64),
+            "hours": np.zeros(capacity, dtype=np.float64),
+            "wh": np.zeros(capacity, dtype=np.float64),
+        }
+        if old is not None:
+            for name, values in old.items():
+                self._cols[name][:self._size] = values[:self._size]
+
+    def _code(self, appliance):
+        if appliance not in self._codes:
+            self._codes[appliance] = len(self._names)
+            self._names.append(appliance)
+        return self._codes[appliance]
+
+    def _write(self, i, appliance, watt, quantity, hours):
+        cols = self._cols
+        cols["appliance"][i] = self._code(appliance)
+        cols["watt"][i] = watt
+        cols["quantity"][i] = quantity
+        cols["total_watt"][i] = watt * quantity
+        cols["hours"][i] = hours
+        cols["wh"][i] = watt * quantity * hours
+        self.total_watt += cols["total_watt"][i]
+        self.total_wh += cols["wh"][i]
+
+    def _unwrite(self, i):
+        self.total_watt -= self._cols["total_watt"][i]
+        self.total_wh -= self._cols["wh"][i]
+
+    def _changed(self):
+        self.version += 1
+        if self._size == 0:
+            # Reset so rounding drift from many edits can't accumulate
+            self.total_watt, self.total_wh = 0, 0.0
+
+    def add(self, appliance, watt, quantity, hours):
+        if self._size == len(self._cols["watt"]):
+            self._alloc(2 * self._size)
+        self._write(self._size, appliance, watt, quantity, hours)
+        self._size += 1
+        self._changed()
+
+    def update(self, index, **changes):
+        """Edit one row; any of appliance, watt, quantity and hours may change."""
+        row = self[index]
+        index %= self._size
+        row.update(changes)
+        self._unwrite(index)
+        self._write(index, row["appliance"], row["watt"], row["quantity"], row["hours"])
+        self._changed()
+
+    def delete(self, *indices):
+        if not indices:
+            return
+        indices = sorted({i % self._size for i in indices}, reverse=True)
+        for i in indices:
+            self._unwrite(i)
+        keep = np.ones(self._size, dtype=bool)
+        keep[indices] = False
+        n = int(keep.sum())
+        for values in self._cols.values():
+            values[:n] = values[:self._size][keep]
+        self._size = n
+        self._changed()
+
+    def clear(self):
+        self._size = 0
+        self._names, self._codes = [], {}
+        self._changed()
+
+    def column(self, name):
+        """Read-only view of one column (appliance comes back as names)."""
+        if name == "appliance":
+            return np.array(self._names, dtype=object)[self._cols["appliance"][:self._size]]
+        view = self._cols[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self):
+        """DataFrame over views of the store's arrays; appliance is categorical."""
+        import pandas as pd
+
+        data = {name: self._cols[name][:self._size] for name in COLUMNS[1:]}
+        data["appliance"] = pd.Categorical.from_codes(self._cols["appliance"][:self._size],
+                                                      categories=pd.Index(self._names, dtype=object))
+        return pd.DataFrame(data, columns=list(COLUMNS), copy=False)
+
+    def records(self):
+        return [self[i] for i in range(self._size)]
+
+    def cache_key(self):
+        return ("LoadStore", self._uid, self.version)
+
+    def __getitem__(self, index):
+        if not -self._size <= index < self._size:
+            raise IndexError(index)
+        index %= self._size
+        cols = self._cols
+        return {
+            "appliance": self._names[cols["appliance"][index]],
+            "watt": cols["watt"][index].item(),
+            "quantity": cols["quantity"][index].item(),
+            "total_watt": cols["total_watt"][index].item(),
+            "hours": cols["hours"][index].item(),
+            "wh": cols["wh"][index].item(),
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(self._size))
+
+    def __len__(self):
+        return self._size
@@ -0,0 +1,345 @@
+"""Email delivery for quotations.
+
+    python mailer.py --status
+    python mailer.py --send-repriced      # email every past client a quotation at current prices
+
+Messages go into an outbox table in the quotes database first, so nothing is
+lost if the server restarts, and are then delivered by background sender
+threads. Each sender keeps one SMTP connection open and reuses it for every
+message it sends. Failed sends are retried with exponential backoff;
+permanent rejections (5xx replies) fail at once.
+
+The SMTP server comes from SOLAR_SMTP_HOST / SOLAR_SMTP_PORT, with optional
+SOLAR_SMTP_USER / SOLAR_SMTP_PASSWORD and SOLAR_SMTP_TLS ("starttls" or
+"ssl"). For local testing, point it at a stand-in server, e.g.
+`python -m aiosmtpd -n -l localhost:1025`.
+"""
+import argparse
+import datetime
+import email.message
+import email.utils
+import functools
+import os
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_quotes import render_job
+from quotation import CLIENT_FIELDS, COMPANY, EMAIL, PHONE, load_item
+from quote_store import QUOTE_DB, open_store
+
+SMTP_HOST = os.environ.get("SOLAR_SMTP_HOST", "")
+SMTP_PORT = int(os.environ.get("SOLAR_SMTP_PORT") or 587)
+SMTP_USER = os.environ.get("SOLAR_SMTP_USER", "")
+SMTP_PASSWORD = os.environ.get("SOLAR_SMTP_PASSWORD", "")
+SMTP_TLS = os.environ.get("SOLAR_SMTP_TLS", "")  # "", "starttls" or "ssl"
+MAIL_FROM = os.environ.get("SOLAR_MAIL_FROM", f"{COMPANY.title()} <{EMAIL}>")
+
+SENDERS = 2  # concurrent SMTP connections
+CLAIM_SIZE = 10  # messages a sender takes from the outbox at a time
+MAX_ATTEMPTS = 5
+BACKOFF = 30.0  # seconds before the first retry, doubling after each failure
+IDLE_TIMEOUT = 60.0  # close a sender's connection after this long without mail
+POLL_INTERVAL = 5.0
+STALE_SENDING = 600.0  # seconds after which a message claimed by a stopped process is sent again
+SMTP_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachment_name TEXT,
+    attachment BLOB,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+"""
+
+STATUS_COLUMNS = ("id", "created_at", "recipient", "subject", "status", "attempts", "last_error", "sent_at")
+
+
+class Outbox:
+    """Persistent queue of outgoing messages: pending -> sending -> sent, or failed after MAX_ATTEMPTS."""
+
+    def __init__(self, path=QUOTE_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def add(self, messages):
+        """Queue (recipient, subject, body, attachment_name, attachment) tuples; returns their IDs."""
+        created_at = datetime.datetime.now().isoformat(timespec="seconds")
+        now = time.time()
+        with self._connect() as conn:
+            return [conn.execute(
+                "INSERT INTO outbox (created_at, recipient, subject, body, attachment_name, attachment, next_attempt)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", (created_at, *message, now)).lastrowid for message in messages]
+
+    def claim(self, limit=CLAIM_SIZE):
+        """Mark up to `limit` due messages as sending and return them.
+
+        A message left sending for STALE_SENDING seconds (its sender's process
+        stopped) is due again.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE outbox SET status = 'sending', next_attempt = ? WHERE id IN (SELECT id FROM outbox"
+                " WHERE (status = 'pending' AND next_attempt <= ?) OR (status = 'sending' AND next_attempt <= ?)"
+                " ORDER BY next_attempt LIMIT ?) RETURNING *",
+                (now, now, now - STALE_SENDING, limit)).fetchall()
+
+    def next_due(self):
+        """When the next pending message is due (Unix time), or None."""
+        return self._connect().execute("SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def sent(self, message_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = 'sent', attempts = attempts + 1, last_error = NULL, sent_at = ?"
+                         " WHERE id = ?", (datetime.datetime.now().isoformat(timespec="seconds"), message_id))
+
+    def failed(self, message_id, error, permanent=False):
+        """Record a failed attempt, rescheduling with backoff unless it was the last one."""
+        with self._connect() as conn:
+            attempts = conn.execute("UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?"
+                                    " RETURNING attempts", (error, message_id)).fetchone()[0]
+            if permanent or attempts >= MAX_ATTEMPTS:
+                conn.execute("UPDATE outbox SET status = 'failed' WHERE id = ?", (message_id,))
+            else:
+                conn.execute("UPDATE outbox SET status = 'pending', next_attempt = ? WHERE id = ?",
+                             (time.time() + BACKOFF * 2 ** (attempts - 1), message_id))
+
+    def status(self, message_id):
+        row = self._connect().execute(f"SELECT {', '.join(STATUS_COLUMNS)} FROM outbox WHERE id = ?",
+                                      (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """Number of messages per status."""
+        return dict(self._connect().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+class Mailer:
+    """Background delivery of the outbox over reused SMTP connections."""
+
+    def __init__(self, outbox, host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD, tls=SMTP_TLS,
+                 sender=MAIL_FROM, senders=SENDERS):
+        self.outbox = outbox
+        self.host, self.port, self.user, self.password, self.tls = host, port, user, password, tls
+        self.sender = sender
+        self.senders = senders
+        self._threads = []
+        self._stop = False
+        self._wake = threading.Condition()
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.host)
+
+    def send(self, recipient, subject, body, attachment=None, attachment_name=None):
+        """Queue one message for delivery and return its outbox ID."""
+        return self.send_many([(recipient, subject, body, attachment_name, attachment)])[0]
+
+    def send_many(self, messages):
+        """Queue (recipient, subject, body, attachment_name, attachment) tuples in one transaction."""
+        ids = self.outbox.add(messages)
+        self.start()
+        with self._wake:
+            self._wake.notify_all()
+        return ids
+
+    def busy(self):
+        """Whether messages are being sent or are due now (retries scheduled for later don't count)."""
+        due = self.outbox.next_due()
+        return bool(self.outbox.counts().get("sending")) or (due is not None and due <= time.time())
+
+    def start(self):
+        # Senders start with the first message, like the PDF workers
+        with self._lock:
+            if not self._threads:
+                self._stop = False
+                self._threads = [threading.Thread(target=self._run, name=f"mail-sender-{i}", daemon=True)
+                                 for i in range(self.senders)]
+                for thread in self._threads:
+                    thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the senders after the messages they are sending; unsent mail stays in the outbox."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stop = True
+        with self._wake:
+            self._wake.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _connect(self):
+        smtp_class = smtplib.SMTP_SSL if self.tls == "ssl" else smtplib.SMTP
+        connection = smtp_class(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.tls == "starttls":
+            connection.starttls()
+        if self.user:
+            connection.login(self.user, self.password)
+        return connection
+
+    def _message(self, row):
+        message = email.message.EmailMessage()
+        message["From"] = self.sender
+        message["To"] = row["recipient"]
+        message["Subject"] = row["subject"]
+        message["Date"] = email.utils.formatdate(localtime=True)
+        message["Message-ID"] = email.utils.make_msgid(f"outbox{row['id']}")
+        message.set_content(row["body"])
+        if row["attachment"] is not None:
+            message.add_attachment(row["attachment"], maintype="application", subtype="pdf",
+                                   filename=row["attachment_name"])
+        return message
+
+    def _run(self):
+        connection, last_used = None, 0.0
+        while not self._stop:
+            rows = self.outbox.claim()
+            if not rows:
+                if time.monotonic() - last_used > IDLE_TIMEOUT:
+                    connection = _quit(connection)
+                due = self.outbox.next_due()
+                wait = POLL_INTERVAL if due is None else min(max(due - time.time(), 0.05), POLL_INTERVAL)
+                with self._wake:
+                    self._wake.wait(wait)
+                continue
+            for row in rows:
+                message = self._message(row)
+                try:
+                    if connection is not None:
+                        try:
+                            connection.send_message(message)
+                        except smtplib.SMTPServerDisconnected:
+                            connection = None  # the server dropped the idle connection; reconnect once
+                    if connection is None:
+                        connection = self._connect()
+                        connection.send_message(message)
+                except smtplib.SMTPRecipientsRefused as e:
+                    self.outbox.failed(row["id"], repr(e), permanent=True)
+                except smtplib.SMTPResponseException as e:
+                    # The server refused this message; smtplib has reset the session, so the connection stays
+                    self.outbox.failed(row["id"], repr(e), permanent=e.smtp_code >= 500)
+                except (smtplib.SMTPException, OSError) as e:
+                    self.outbox.failed(row["id"], repr(e))
+                    connection = _quit(connection)
+                else:
+                    self.outbox.sent(row["id"])
+                last_used = time.monotonic()
+        _quit(connection)
+
+
+def _quit(connection):
+    if connection is None:
+        return None
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def open_mailer(path=QUOTE_DB):
+    """Shared mailer per database file, configured from the environment."""
+    return Mailer(Outbox(path))
+
+
+def quote_email(quote):
+    """Subject and body for a quotation email."""
+    subject = f"Your solar quotation from {COMPANY.title()}"
+    body = (f"Dear {quote['client_name'] or 'Customer'},\n\n"
+            f"Please find attached your solar system quotation for {quote['project_location'] or 'your site'}.\n\n"
+            f"For questions or to schedule installation, call {PHONE} or reply to this email.\n\n"
+            f"{COMPANY.title()}\n")
+    return subject, body
+
+
+def send_repriced(mailer, store=None, workers=None, chunk_size=64, log=sys.stderr):
+    """Queue a fresh quotation at current prices to every saved client with an email.
+
+    Saved quotes are left as they are. PDFs are rendered in a process pool, a chunk at a time. A quote that fails to render (e.g. its battery
+    has left the catalog) is reported to `log` and skipped. Returns (queued, failed).
+    """
+    store = store or open_store()
+    issued = datetime.datetime.now()
+    queued = failed = 0
+    with ProcessPoolExecutor(workers) as pool:
+        for chunk in store.iter_quotes(with_email=True, chunk_size=chunk_size):
+            futures = [pool.submit(render_job, saved["id"],
+                                   {"client": {field: saved[field] for field in CLIENT_FIELDS},
+                                    "settings": saved["settings"],
+                                    "loads": [load_item(**item) for item in saved["loads"]]}, issued)
+                       for saved in chunk]
+            messages = []
+            for saved, future in zip(chunk, futures):
+                try:
+                    filename, pdf = future.result()
+                except Exception as exc:
+                    failed += 1
+                    print(f"Quote #{saved['id']} failed: {exc!r}", file=log)
+                    continue
+                messages.append((saved["client_email"], *quote_email(saved), filename, pdf))
+            if messages:
+                mailer.send_many(messages)
+                queued += len(messages)
+    return queued, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send quotation emails from the outbox.")
+    parser.add_argument("--send-repriced", action="store_true",
+                        help="email every past client a fresh quotation at current prices")
+    parser.add_argument("--status", action="store_true", help="show outbox counts and exit")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="PDF worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    mailer = open_mailer()
+    failed = 0
+    if args.send_repriced:
+        if not mailer.configured:
+            print("Set SOLAR_SMTP_HOST to send email", file=sys.stderr)
+            return 1
+        queued, failed = send_repriced(mailer, workers=args.workers)
+        print(f"Queued {queued:,} quotations")
+        if failed:
+            print(f"{failed} quotations failed", file=sys.stderr)
+    if not args.status and mailer.configured:
+        # Deliver whatever is due, then report
+        mailer.start()
+        while mailer.busy():
+            time.sleep(0.2)
+        mailer.stop()
+    counts = mailer.outbox.counts()
+    print(", ".join(f"{counts.get(status, 0):,} {status}" for status in ("pending", "sending", "sent", "failed")))
+    return 1 if failed or counts.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+# Load profiles from smart-meter or generator-log CSVs.
+#
+# Files can run to millions of 15-minute rows, so they are read in fixed-size
+# chunks of just the timestamp and reading columns. Each chunk is folded into
+# per-day energy totals, a 24-bin hour-of-day energy histogram and the running
+# peak, so memory stays bounded by the chunk size and the number of days.
+
+CHUNK_ROWS = 200_000
+MAX_GAP_HOURS = 1.0  # longer gaps between readings are treated as missing data, not load
+
+# Reading units recognised from the column name, most specific first
+UNITS = {"kwh": ("energy", 1000.0), "wh": ("energy", 1.0), "kw": ("power", 1000.0), "watt": ("power", 1.0),
+         "power": ("power", 1.0), "load": ("power", 1.0), "demand": ("power", 1.0)}
+UNIT_NAMES = {"Wh": ("energy", 1.0), "kWh": ("energy", 1000.0), "W": ("power", 1.0), "kW": ("power", 1000.0)}
+
+
+def _detect_columns(header, timestamp_column=None, value_column=None, unit=None):
+    columns = [str(c) for c in header]
+    lowered = [c.lower() for c in columns]
+    if timestamp_column is None:
+        timestamp_column = next((c for c, low in zip(columns, lowered) if "time" in low or "date" in low), columns[0])
+    if value_column is None:
+        value_column = next((c for c, low in zip(columns, lowered)
+                             if c != timestamp_column and any(u in low for u in UNITS)), None)
+        if value_column is None:
+            raise ValueError("No reading column found; expected a kWh, Wh, kW or W column")
+    if unit is None:
+        kind, scale = next((UNITS[u] for u in UNITS if u in value_column.lower()), ("power", 1.0))
+    else:
+        kind, scale = UNIT_NAMES[unit]
+    return timestamp_column, value_column, kind, scale
+
+
+def profile_meter_log(source, timestamp_column=None, value_column=None, unit=None, dayfirst=False,
+                      chunk_rows=CHUNK_ROWS, progress=None):
+    """Daily energy, peak demand and hourly profile from a meter or generator-log CSV.
+
+    `source` is a path or binary file object. Readings are interval energy
+    (kWh/Wh columns) or instantaneous power (kW/W columns), detected from the
+    column name unless `unit` is given. `progress(fraction)` is called after
+    every chunk.
+    """
+    close = isinstance(source, str)
+    f = open(source, "rb") if close else source
+    try:
+        f.seek(0, 2)
+        size = f.tell() or 1
+        f.seek(0)
+        header = pd.read_csv(f, nrows=0).columns
+        f.seek(0)
+        timestamp_column, value_column, kind, scale = _detect_columns(header, timestamp_column, value_column, unit)
+
+        daily = {}
+        hourly_wh = np.zeros(24)
+        peak_w, peak_at, rows = 0.0, None, 0
+        last_time = None  # carried across chunks so the first interval of each chunk is measured
+        for chunk in pd.read_csv(f, usecols=[timestamp_column, value_column], chunksize=chunk_rows):
+            times = pd.to_datetime(chunk[timestamp_column], errors="coerce", dayfirst=dayfirst)
+            values = pd.to_numeric(chunk[value_column], errors="coerce") * scale
+            valid = times.notna() & values.notna()
+            times, values = times[valid].to_numpy("datetime64[s]"), values[valid].to_numpy(np.float64)
+            if not len(times):
+                continue
+            rows += len(times)
+
+            # Readings close the interval since the previous one ("interval ending")
+            previous = np.concatenate(([times[0] if last_time is None else last_time], times[:-1]))
+            step = (times - previous).astype(np.float64) / 3600.0
+            if last_time is None and len(step) > 1:
+                step[0] = np.median(step[1:])
+            last_time = times[-1]
+            measured = (step > 0) & (step <= MAX_GAP_HOURS)
+            if kind == "energy":
+                times, step = times[measured], step[measured]
+                energy = values[measured]
+                power = energy / step
+                peak_times = times
+            else:
+                # A power reading after a gap still counts towards the peak, but not towards energy
+                power, peak_times = values, times
+                energy = values[measured] * step[measured]
+                times, step = times[measured], step[measured]
+            if len(power):
+                top = power.argmax()
+                if power[top] > peak_w:
+                    peak_w, peak_at = float(power[top]), pd.Timestamp(peak_times[top])
+
+            # Attribute each interval to the hour and day it started in
+            start = times - (step * 3600).astype("timedelta64[s]")
+            hourly_wh += np.bincount((start.astype("datetime64[h]").astype(np.int64) % 24), weights=energy,
+                                     minlength=24)
+            days, day_index = np.unique(start.astype("datetime64[D]"), return_inverse=True)
+            for day, wh in zip(days, np.bincount(day_index, weights=energy)):
+                daily[day] = daily.get(day, 0.0) + wh
+
+            if progress is not None:
+                progress(min(f.tell() / size, 1.0))
+    finally:
+        if close:
+            f.close()
+
+    if not daily:
+        raise ValueError("No valid readings found")
+    daily_wh = pd.Series(daily, dtype=np.float64).sort_index()
+    daily_wh.index = pd.DatetimeIndex(daily_wh.index)
+    return {
+        "rows": rows,
+        "days": len(daily_wh),
+        "daily_wh": daily_wh,
+        "average_daily_wh": float(daily_wh.mean()),
+        "peak_w": peak_w,
+        "peak_at": peak_at,
+        "hourly_w": hourly_wh / len(daily_wh),  # average draw in each hour of the day
+    }
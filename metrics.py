@@ -0,0 +1,122 @@
+import contextlib
+import csv
+import datetime
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Timings for the app's hot paths, kept in a rolling in-memory buffer per
+# section. Recording is off unless SOLAR_PROFILE is set for the whole process
+# or a session switches it on for its own script thread with enable() (see
+# the ?profile= query parameter in solar_app.py); while off, span() hands back
+# a shared no-op context manager and laps are skipped.
+
+PROFILE = os.environ.get("SOLAR_PROFILE", "").lower() not in ("", "0", "false", "no")
+SAMPLES = 500  # most recent timings kept per section
+
+_OFF = contextlib.nullcontext()
+
+
+class Stopwatch:
+    """Times consecutive stretches of straight-line code: each lap() records the time since the previous one."""
+
+    def __init__(self, metrics):
+        self._metrics = metrics
+        self._last = time.perf_counter()
+
+    def lap(self, section):
+        now = time.perf_counter()
+        if self._metrics.enabled:
+            self._metrics.record(section, now - self._last)
+        self._last = now
+
+
+class Metrics:
+    def __init__(self, samples=SAMPLES, always=PROFILE):
+        self.samples = samples
+        self.always = always
+        self._timings = {}  # section -> deque of (recorded_at, seconds)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.always or getattr(self._local, "enabled", False)
+
+    def enable(self, on=True):
+        """Switch recording on or off for the calling thread (one Streamlit session's script run)."""
+        self._local.enabled = on
+
+    def record(self, section, seconds, recorded_at=None):
+        with self._lock:
+            timings = self._timings.setdefault(section, deque(maxlen=self.samples))
+            timings.append((time.time() if recorded_at is None else recorded_at, seconds))
+
+    def span(self, section):
+        """Context manager timing its block as `section`."""
+        return self._span(section) if self.enabled else _OFF
+
+    @contextlib.contextmanager
+    def _span(self, section):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(section, time.perf_counter() - start)
+
+    def timed(self, section):
+        """Decorator timing every call as `section`."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(section):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stopwatch(self):
+        return Stopwatch(self)
+
+    def stats(self):
+        """One row per section with call count and p50/p95/max in milliseconds, slowest p95 first."""
+        with self._lock:
+            timings = {section: np.array([s for _, s in values]) * 1000 for section, values in self._timings.items()}
+        rows = []
+        for section, ms in timings.items():
+            p50, p95 = np.percentile(ms, [50, 95])
+            rows.append({"section": section, "count": len(ms), "p50_ms": float(p50), "p95_ms": float(p95),
+                         "max_ms": float(ms.max())})
+        rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return rows
+
+    def timings(self):
+        """Every buffered timing as (section, recorded_at, seconds), oldest first."""
+        with self._lock:
+            rows = [(section, at, seconds) for section, values in self._timings.items() for at, seconds in values]
+        return sorted(rows, key=lambda row: row[1])
+
+    def drain(self):
+        """Buffered timings, removed from the buffer (used to hand a worker process's timings back)."""
+        with self._lock:
+            rows = [(section, at, seconds) for section, values in self._timings.items() for at, seconds in values]
+            self._timings.clear()
+        return rows
+
+    def export(self, f):
+        """Write every buffered timing to the text file `f` as CSV."""
+        writer = csv.writer(f)
+        writer.writerow(["section", "recorded_at", "seconds"])
+        for section, at, seconds in self.timings():
+            writer.writerow([section, datetime.datetime.fromtimestamp(at).isoformat(timespec="milliseconds"),
+                             f"{seconds:.6f}"])
+
+    def clear(self):
+        with self._lock:
+            self._timings.clear()
+
+
+metrics = Metrics()
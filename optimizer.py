@@ -0,0 +1,127 @@
+import numpy as np
+
+from catalog import SYSTEM_VOLTAGES, current_catalog
+from sizing import battery_bank, solar_array, inverter_rating
+
+# Catalog-wide system search.
+#
+# The system cost splits into three independent terms: battery(voltage, battery),
+# panels(voltage, panel) and inverter(voltage, inverter). Each term is evaluated
+# once per catalog axis instead of over the full panel x battery x inverter x
+# voltage product, and the searches below only combine the few entries per axis
+# that can still win.
+
+
+def _columns(catalog, *fields):
+    names = np.array(list(catalog.keys()), dtype=object)
+    return names, [np.array([item[f] for item in catalog.values()], dtype=np.float64) for f in fields]
+
+
+def _cost_terms(total_wh, total_watt, backup_time, dod_limit, temperature_factor, sun_hours,
+                system_efficiency, panels, batteries, inverters, voltages):
+    if None in (panels, batteries, inverters):
+        # Unspecified component lists come from the current shared catalog
+        catalog = current_catalog()
+        panels = catalog.panels if panels is None else panels
+        batteries = catalog.batteries if batteries is None else batteries
+        inverters = catalog.inverters if inverters is None else inverters
+    voltages = np.asarray(voltages, dtype=np.float64)[:, None]
+    panel_names, (panel_price, panel_vmp) = _columns(panels, "price", "vmp")
+    battery_names, (battery_price, battery_capacity, battery_volt, battery_cycles) = _columns(
+        batteries, "price", "capacity", "voltage", "life_cycles")
+    inverter_names, (inverter_price, inverter_power, inverter_volt) = _columns(
+        inverters, "price", "power", "voltage")
+
+    # (voltage, battery): a bank is strings of voltage / battery_volt batteries in series, so the
+    # count covers every battery in every string and batteries that don't divide the voltage are out
+    _, strings = battery_bank(total_wh, backup_time, voltages, dod_limit, temperature_factor, battery_capacity)
+    num_batteries = strings * (voltages / battery_volt)
+    battery_cost = np.where(voltages % battery_volt == 0, num_batteries * battery_price, np.inf)
+
+    # (voltage, panel)
+    _, num_panels, _ = solar_array(total_wh, sun_hours, system_efficiency, voltages, panel_vmp)
+    panel_cost = num_panels * panel_price
+
+    # (voltage, inverter): matching DC voltage and enough headroom over the peak load
+    feasible = (inverter_volt == voltages) & (inverter_power >= inverter_rating(total_watt))
+    inverter_cost = np.where(feasible, inverter_price, np.inf)
+
+    return {
+        "voltages": voltages[:, 0],
+        "panel": (panel_names, panel_cost, num_panels),
+        "battery": (battery_names, battery_cost, num_batteries, battery_cycles),
+        "inverter": (inverter_names, inverter_cost),
+    }
+
+
+def _records(terms, v, b, p, i, total_cost):
+    panel_names, _, num_panels = terms["panel"]
+    battery_names, _, num_batteries, battery_cycles = terms["battery"]
+    inverter_names, _ = terms["inverter"]
+    return [
+        {
+            "battery_voltage": int(terms["voltages"][vi]),
+            "panel": panel_names[pi],
+            "num_panels": float(num_panels[vi, pi]),
+            "battery": battery_names[bi],
+            "num_batteries": float(num_batteries[vi, bi]),
+            "life_cycles": int(battery_cycles[bi]),
+            "inverter": inverter_names[ii],
+            "total_cost": float(cost),
+        }
+        for vi, bi, pi, ii, cost in zip(v, b, p, i, total_cost)
+    ]
+
+
+def pareto_front(total_wh, total_watt, backup_time, dod_limit, temperature_factor, sun_hours, system_efficiency,
+                 panels=None, batteries=None, inverters=None, voltages=SYSTEM_VOLTAGES):
+    """Systems not beaten on both cost and battery life cycles, cheapest first."""
+    terms = _cost_terms(total_wh, total_watt, backup_time, dod_limit, temperature_factor, sun_hours,
+                        system_efficiency, panels, batteries, inverters, voltages)
+    _, panel_cost, _ = terms["panel"]
+    _, battery_cost, _, battery_cycles = terms["battery"]
+    _, inverter_cost = terms["inverter"]
+
+    # Panels and inverters don't affect life cycles, so only the cheapest of each can be on the front
+    best_panel = panel_cost.argmin(axis=1)
+    best_inverter = inverter_cost.argmin(axis=1)
+    rows = np.arange(len(terms["voltages"]))
+    total_cost = battery_cost + (panel_cost[rows, best_panel] + inverter_cost[rows, best_inverter])[:, None]
+
+    v, b = np.nonzero(np.isfinite(total_cost))
+    cost, cycles = total_cost[v, b], battery_cycles[b]
+    order = np.lexsort((-cycles, cost))
+    v, b, cost, cycles = v[order], b[order], cost[order], cycles[order]
+    best_so_far = np.maximum.accumulate(np.concatenate(([-np.inf], cycles[:-1])))
+    keep = cycles > best_so_far
+    v, b = v[keep], b[keep]
+    return _records(terms, v, b, best_panel[v], best_inverter[v], cost[keep])
+
+
+def cheapest_systems(total_wh, total_watt, backup_time, dod_limit, temperature_factor, sun_hours, system_efficiency,
+                     panels=None, batteries=None, inverters=None, voltages=SYSTEM_VOLTAGES, limit=10):
+    """The `limit` cheapest feasible systems, ranked by total cost."""
+    terms = _cost_terms(total_wh, total_watt, backup_time, dod_limit, temperature_factor, sun_hours,
+                        system_efficiency, panels, batteries, inverters, voltages)
+    _, panel_cost, _ = terms["panel"]
+    _, battery_cost, _, _ = terms["battery"]
+    _, inverter_cost = terms["inverter"]
+
+    # A system in the overall top `limit` must use a top-`limit` entry on every axis
+    def shortlist(cost):
+        k = min(limit, cost.shape[1])
+        idx = np.argpartition(cost, k - 1, axis=1)[:, :k]
+        return idx, np.take_along_axis(cost, idx, axis=1)
+
+    b_idx, b_cost = shortlist(battery_cost)
+    p_idx, p_cost = shortlist(panel_cost)
+    i_idx, i_cost = shortlist(inverter_cost)
+    total_cost = b_cost[:, :, None, None] + p_cost[:, None, :, None] + i_cost[:, None, None, :]
+
+    flat = total_cost.ravel()
+    finite = np.flatnonzero(np.isfinite(flat))
+    if finite.size > limit:
+        finite = finite[np.argpartition(flat[finite], limit - 1)[:limit]]
+    finite = finite[np.argsort(flat[finite], kind="stable")]
+    v, bk, pk, ik = np.unravel_index(finite, total_cost.shape)
+    return _records(terms, v, b_idx[v, bk], p_idx[v, pk], i_idx[v, ik], flat[finite])
@@ -0,0 +1,128 @@
+import datetime
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from metrics import metrics
+from quotation import build_quotation_pdf
+from workers import spawn_context
+
+# Background PDF rendering shared by every Streamlit session in the server
+# process. Jobs are identified by a hash of the quote inputs, so submitting the
+# same quote twice (a double click, or a rerun after download) reuses the
+# in-flight job or the cached document instead of rendering again.
+
+PDF_WORKERS = 2
+MAX_PENDING = 16
+CACHE_SIZE = 64
+
+
+class QueueFull(RuntimeError):
+    pass
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot hash {type(value).__name__} in a quote")
+
+
+def quote_key(quote):
+    payload = json.dumps(quote, sort_keys=True, default=_jsonable, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _render(quote, profile=False):
+    # Timings are recorded in the worker process and handed back with the document
+    metrics.enable(profile)
+    pdf = build_quotation_pdf(quote).getvalue()
+    return pdf, metrics.drain()
+
+
+class PDFJobQueue:
+    def __init__(self, workers=PDF_WORKERS, max_pending=MAX_PENDING, cache_size=CACHE_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.cache_size = cache_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # job_id -> Future, in submission order
+        self._failed = {}  # job_id -> error message
+        self._done = OrderedDict()  # job_id -> PDF bytes, least recently used first
+
+    def _executor(self):
+        # Started lazily; "spawn" keeps workers clear of the server's threads, without re-running the app script
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=spawn_context)
+        return self._pool
+
+    def submit(self, quote, profile=False):
+        """Queue `quote` for rendering and return its job ID; `profile` times the render's phases."""
+        job_id = quote_key(quote)
+        with self._lock:
+            if job_id in self._done or job_id in self._pending:
+                return job_id
+            if len(self._pending) >= self.max_pending:
+                raise QueueFull(f"{len(self._pending)} quotations are already being generated")
+            self._failed.pop(job_id, None)
+            future = self._executor().submit(_render, quote, profile)
+            self._pending[job_id] = future
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id, future):
+        with self._lock:
+            self._pending.pop(job_id, None)
+            if future.exception() is not None:
+                self._failed[job_id] = repr(future.exception())
+                return
+            pdf, timings = future.result()
+            self._done[job_id] = pdf
+            self._done.move_to_end(job_id)
+            while len(self._done) > self.cache_size:
+                self._done.popitem(last=False)
+        for section, recorded_at, seconds in timings:
+            metrics.record(section, seconds, recorded_at)
+
+    def status(self, job_id):
+        """State of a job: queued (with its position), running, done, failed or unknown."""
+        with self._lock:
+            if job_id in self._done:
+                return {"state": "done", "progress": 1.0}
+            if job_id in self._failed:
+                return {"state": "failed", "progress": 1.0, "error": self._failed[job_id]}
+            if job_id not in self._pending:
+                return {"state": "unknown", "progress": 0.0}
+            if self._pending[job_id].running():
+                return {"state": "running", "progress": 0.5}
+            waiting = [j for j, f in self._pending.items() if not f.running()]
+            return {"state": "queued", "progress": 0.1, "position": waiting.index(job_id) + 1}
+
+    def wait(self, job_id, timeout=None):
+        """Block until a submitted job is rendered and return its PDF bytes; a failed render raises."""
+        with self._lock:
+            future = self._pending.get(job_id)
+            if future is None:
+                if job_id in self._failed:
+                    raise RuntimeError(self._failed[job_id])
+                return self._done.get(job_id)
+        return future.result(timeout)[0]
+
+    def result(self, job_id):
+        """The finished PDF bytes, or None if the job is not done (or was evicted)."""
+        with self._lock:
+            pdf = self._done.get(job_id)
+            if pdf is not None:
+                self._done.move_to_end(job_id)
+            return pdf
+
+
+pdf_queue = PDFJobQueue()
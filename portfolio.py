@@ -0,0 +1,172 @@
+"""Size a portfolio of sites (e.g. an estate's housing units) and total the bill of materials.
+
+    python portfolio.py sites.csv -j 8 -o portfolio_bom.csv
+
+Input is the same CSV or JSON batch format as batch_quotes.py: one group of
+load rows per site, with optional per-site settings columns.
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_quotes import read_jobs
+from catalog import current_catalog
+from quotation import resolve_settings
+from sizing import INSTALLATION_COST, SIZING_FIELDS, size_systems, financials
+from workers import spawn_context
+
+# Sites are sized in chunks, each chunk in one vectorized size_systems() call.
+# Large portfolios spread the chunks over a process pool; below
+# PARALLEL_MIN_SITES a single process is faster than starting workers.
+
+CHUNK_SIZE = 2000
+PARALLEL_MIN_SITES = 20_000
+
+SITE_FIELDS = ("site", "project_location", "total_watt", "total_wh", "battery_type", "num_batteries", "panel_type",
+               "num_panels", "selected_inverter", "total_cost", "monthly_savings", "total_savings", "payback_period",
+               "roi", "error")
+SETTING_COLUMNS = ("backup_time", "battery_voltage", "dod_limit", "temperature_factor", "sun_hours",
+                   "system_efficiency", "current_electricity_rate", "system_lifespan")
+
+
+def size_sites(jobs):
+    """Size and cost a list of jobs in one vectorized pass, one result dict per job in order."""
+    catalog = current_catalog()
+    sites, inputs = [], []
+    for job in jobs:
+        client = job["client"]
+        s = resolve_settings(client, job["settings"], catalog)
+        site = {"site": client.get("client_name") or f"Site {len(sites) + 1}",
+                "project_location": client.get("project_location", ""),
+                "total_watt": float(sum(item["total_watt"] for item in job["loads"])),
+                "total_wh": float(sum(item["wh"] for item in job["loads"])),
+                "battery_voltage": s["battery_voltage"], "battery_type": s["battery_type"], "panel_type": s["panel_type"],
+                "selected_inverter": s["selected_inverter"], "error": ""}
+        sites.append(site)
+        try:
+            battery = catalog.batteries[s["battery_type"]]
+            panel = catalog.panels[s["panel_type"]]
+            inverter = catalog.inverters[s["selected_inverter"]]
+        except KeyError as e:
+            site["error"] = f"Unknown component {e}"
+            continue
+        inputs.append((site, [s[c] for c in SETTING_COLUMNS], battery, panel, inverter))
+    if not inputs:
+        return sites
+
+    settings = dict(zip(SETTING_COLUMNS, np.array([row[1] for row in inputs], dtype=np.float64).T))
+    def column(values):
+        return np.array(values, dtype=np.float64)
+
+    total_wh = column([row[0]["total_wh"] for row in inputs])
+    sized = size_systems(
+        total_wh, column([row[0]["total_watt"] for row in inputs]), settings["backup_time"],
+        settings["battery_voltage"], settings["dod_limit"], settings["temperature_factor"], settings["sun_hours"],
+        settings["system_efficiency"], column([row[2]["capacity"] for row in inputs]),
+        column([row[2]["price"] for row in inputs]), column([row[3]["vmp"] for row in inputs]),
+        column([row[3]["price"] for row in inputs]), column([row[4]["price"] for row in inputs]))
+    money = financials(total_wh, sized["total_cost"], settings["current_electricity_rate"],
+                       settings["system_lifespan"])
+    for i, (site, *_) in enumerate(inputs):
+        for field in SIZING_FIELDS:
+            site[field] = float(sized[field][i])
+        for field, values in money.items():
+            site[field] = float(values[i])
+    return sites
+
+
+def bill_of_materials(sites):
+    """Combined bill of materials, one line per SKU.
+
+    `quantity` sums the sites' quoted quantities; `units` counts whole units to
+    order, rounding up per site because a battery or panel can't be shared
+    between houses.
+    """
+    catalog = current_catalog()
+    lines = {}
+    for site in sites:
+        if site["error"]:
+            continue
+        for category, component, quantity in (("battery", site["battery_type"], site["num_batteries"]),
+                                              ("panel", site["panel_type"], site["num_panels"]),
+                                              ("inverter", site["selected_inverter"], 1)):
+            line = lines.setdefault(component, {"category": category, "component": component, "quantity": 0.0,
+                                                "units": 0, "unit_price": catalog.components[category][component]["price"]})
+            line["quantity"] += quantity
+            line["units"] += math.ceil(quantity - 1e-9)
+    bom = sorted(lines.values(), key=lambda line: (line["category"], line["component"]))
+    sized = sum(1 for site in sites if not site["error"])
+    if sized:
+        bom.append({"category": "service", "component": "Installation & Misc", "quantity": float(sized),
+                    "units": sized, "unit_price": INSTALLATION_COST})
+    for line in bom:
+        line["amount"] = line["quantity"] * line["unit_price"]
+        line["order_amount"] = line["units"] * line["unit_price"]
+    return bom
+
+
+def summarize(sites):
+    """Portfolio totals; costs and ROI use the same equipment-only basis as a single quote."""
+    sized = [site for site in sites if not site["error"]]
+    total_cost = sum(site["total_cost"] for site in sized)
+    monthly_savings = sum(site["monthly_savings"] for site in sized)
+    total_savings = sum(site["total_savings"] for site in sized)
+    return {
+        "sites": len(sites),
+        "failed": len(sites) - len(sized),
+        "total_watt": sum(site["total_watt"] for site in sized),
+        "total_wh": sum(site["total_wh"] for site in sized),
+        "total_cost": total_cost,
+        "installation_cost": INSTALLATION_COST * len(sized),
+        "monthly_savings": monthly_savings,
+        "total_savings": total_savings,
+        "payback_period": total_cost / (monthly_savings * 12) if monthly_savings else math.inf,
+        "roi": (total_savings - total_cost) / total_cost * 100 if total_cost else 0.0,
+    }
+
+
+def size_portfolio(jobs, workers=None, chunk_size=CHUNK_SIZE):
+    """Size every site in `jobs` (see batch_quotes.read_jobs) and return (sites, bom, summary)."""
+    jobs = list(jobs)
+    workers = workers or os.cpu_count() or 1
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    if workers == 1 or len(chunks) == 1 or len(jobs) < PARALLEL_MIN_SITES:
+        results = map(size_sites, chunks)
+        sites = [site for chunk in results for site in chunk]
+    else:
+        with ProcessPoolExecutor(min(workers, len(chunks)), mp_context=spawn_context) as pool:
+            sites = [site for chunk in pool.map(size_sites, chunks) for site in chunk]
+    return sites, bill_of_materials(sites), summarize(sites)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Size a portfolio of sites and total the bill of materials.")
+    parser.add_argument("input", help="CSV or JSON batch file")
+    parser.add_argument("-o", "--output", default="portfolio_bom.csv", help="bill of materials CSV to write")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sites, bom, summary = size_portfolio(read_jobs(args.input), args.workers)
+    seconds = time.perf_counter() - start
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(bom[0]) if bom else ["component"])
+        writer.writeheader()
+        writer.writerows(bom)
+    print(f"Sized {summary['sites'] - summary['failed']} of {summary['sites']} sites in {seconds:.2f} s -> {args.output}")
+    print(f"Equipment ₦{summary['total_cost']:,.0f} + installation ₦{summary['installation_cost']:,.0f}; "
+          f"payback {summary['payback_period']:.1f} years, ROI {summary['roi']:.0f}%")
+    for site in sites:
+        if site["error"]:
+            print(f"{site['site']}: {site['error']}", file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+from io import BytesIO
+import datetime
+import importlib.util
+
+from catalog import current_catalog
+from irradiance import climate_table
+from metrics import metrics
+from sizing import INSTALLATION_COST, battery_bank, solar_array, inverter_rating, system_cost, financials
+
+# reportlab is imported by build_quotation_pdf() itself, so only PDF rendering pays for it
+REPORTLAB_AVAILABLE = importlib.util.find_spec("reportlab") is not None
+
+# Branding info - Enhanced with Nigerian context
+COMPANY = "ANNUR TECH SOLAR SOLUTIONS"
+MOTTO = "Illuminating Nigeria's Future"
+ADDRESS = "No 6 Kolo Drive, Behind Zuma Barrack, Tafa LGA, Niger State, Nigeria"
+PHONE = "+234 905 169 3000"
+EMAIL = "albataskumyjr@gmail.com"
+WEBSITE = "www.annurtech.ng"
+BUSINESS_NUMBER = "BN: 2984173"
+CAC_REGISTRATION = "CAC/RC: 1847263"
+
+# Sizing inputs and component choices, defaulting to the app's widget defaults. The catalog is
+# hot-reloaded, so the default components ("" here) are picked by default_settings() on each call.
+DEFAULT_SETTINGS = {
+    "backup_time": 5,
+    "battery_voltage": 24,
+    "dod_limit": 80,
+    "temperature_factor": 90,
+    "sun_hours": 5.0,
+    "system_efficiency": 75,
+    "battery_type": "",
+    "panel_type": "",
+    "selected_inverter": "",
+    "current_electricity_rate": 50,
+    "system_lifespan": 10,
+}
+COMPONENT_SETTINGS = {"battery_type": "battery", "panel_type": "panel", "selected_inverter": "inverter"}
+
+CLIENT_FIELDS = ("client_name", "client_address", "client_phone", "client_email", "project_location")
+
+# Everything build_quotation_pdf() reads from a quote, besides load_data
+QUOTE_FIELDS = CLIENT_FIELDS + (
+    "total_watt", "total_wh", "backup_time", "battery_voltage", "dod_limit",
+    "battery_type", "battery_info", "battery_capacity_ah", "num_batteries",
+    "panel_type", "panel_info", "required_solar", "num_panels", "controller_current",
+    "selected_inverter", "inverter_info", "inverter_size", "total_cost",
+    "monthly_savings", "total_savings", "payback_period", "roi", "system_lifespan",
+)
+
+
+def load_item(appliance, watt, quantity, hours):
+    total_watt = watt * quantity
+    return {
+        "appliance": appliance,
+        "watt": watt,
+        "quantity": quantity,
+        "total_watt": total_watt,
+        "hours": hours,
+        "wh": total_watt * hours
+    }
+
+
+def bill_of_materials(quote):
+    """Line items for the quoted system: battery bank, panels, inverter and installation."""
+    return [
+        {"component": quote["battery_type"], "quantity": float(quote["num_batteries"]),
+         "unit_price": quote["battery_info"]["price"]},
+        {"component": quote["panel_type"], "quantity": float(quote["num_panels"]),
+         "unit_price": quote["panel_info"]["price"]},
+        {"component": quote["selected_inverter"], "quantity": 1, "unit_price": quote["inverter_info"]["price"]},
+        {"component": "Installation & Misc", "quantity": 1, "unit_price": INSTALLATION_COST},
+    ]
+
+
+def default_settings(catalog=None):
+    """DEFAULT_SETTINGS with the first battery, panel and inverter listed in the current catalog."""
+    catalog = catalog or current_catalog()
+    s = dict(DEFAULT_SETTINGS)
+    s.update((setting, next(iter(catalog.components[category]))) for setting, category in COMPONENT_SETTINGS.items())
+    return s
+
+
+def resolve_settings(client, settings=None, catalog=None):
+    """Defaults, then the project location's sun hours and temperature derating, then explicit settings."""
+    s = default_settings(catalog)
+    climate = climate_table()
+    if client.get("project_location") in climate:
+        s.update(climate.design_inputs(client["project_location"]))
+    s.update(settings or {})
+    return s
+
+
+def prepare_quote(client, load_data, settings=None, catalog=None):
+    """Size and price a system headlessly, returning everything the quotation needs."""
+    catalog = catalog or current_catalog()
+    panels, batteries, inverters = catalog.panels, catalog.batteries, catalog.inverters
+    s = resolve_settings(client, settings, catalog)
+    quote = {field: client.get(field, "") for field in CLIENT_FIELDS}
+    quote.update(s)
+    quote["load_data"] = list(load_data)
+    quote["total_wh"] = total_wh = sum(item["wh"] for item in load_data)
+    quote["total_watt"] = total_watt = sum(item["total_watt"] for item in load_data)
+    battery_info = quote["battery_info"] = batteries[s["battery_type"]]
+    panel_info = quote["panel_info"] = panels[s["panel_type"]]
+    inverter_info = quote["inverter_info"] = inverters[s["selected_inverter"]]
+
+    quote["battery_capacity_ah"], quote["num_batteries"] = battery_bank(
+        total_wh, s["backup_time"], s["battery_voltage"], s["dod_limit"], s["temperature_factor"],
+        battery_info["capacity"])
+    quote["required_solar"], quote["num_panels"], quote["controller_current"] = solar_array(
+        total_wh, s["sun_hours"], s["system_efficiency"], s["battery_voltage"], panel_info["vmp"])
+    quote["inverter_size"] = inverter_rating(total_watt)
+    quote["total_cost"] = system_cost(quote["num_batteries"], battery_info["price"],
+                                      quote["num_panels"], panel_info["price"], inverter_info["price"])
+    quote.update(financials(total_wh, quote["total_cost"], s["current_electricity_rate"], s["system_lifespan"]))
+    return quote
+
+
+def build_quotation_pdf(quote, output=None):
+    """Render a quotation built by prepare_quote() into `output` (a new BytesIO by default)."""
+    watch = metrics.stopwatch()
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib import colors
+
+    buffer = BytesIO() if output is None else output
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    
+    # Create custom styles
+    title_style = ParagraphStyle(
+        'Title',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.HexColor('#006400'),
+        spaceAfter=30,
+        alignment=1
+    )
+    
+    heading_style = ParagraphStyle(
+        'Heading',
+        parent=styles['Heading2'],
+        fontSize=12,
+        textColor=colors.HexColor('#006400'),
+        spaceAfter=12
+    )
+    
+    normal_style = ParagraphStyle(
+        'Normal',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=6
+    )
+    
+    (client_name, client_address, client_phone, client_email, project_location,
+     total_watt, total_wh, backup_time, battery_voltage, dod_limit,
+     battery_type, battery_info, battery_capacity_ah, num_batteries,
+     panel_type, panel_info, required_solar, num_panels, controller_current,
+     selected_inverter, inverter_info, inverter_size, total_cost,
+     monthly_savings, total_savings, payback_period, roi, system_lifespan) = (quote[k] for k in QUOTE_FIELDS)
+    issued = quote.get("date") or datetime.datetime.now()
+    
+    story = []
+    
+    # Header with Nigerian colors
+    story.append(Paragraph(COMPANY, title_style))
+    story.append(Paragraph(MOTTO, styles['Heading2']))
+    story.append(Spacer(1, 20))
+    
+    # Client Information
+    story.append(Paragraph("CLIENT INFORMATION", heading_style))
+    client_data = [
+        ["Name:", client_name],
+        ["Address:", client_address],
+        ["Phone:", client_phone],
+        ["Email:", client_email if client_email else "Not provided"],
+        ["Location:", project_location],
+        ["Date:", issued.strftime("%Y-%m-%d %H:%M")],
+        ["Quote Reference:", quote.get("quote_reference") or f"ANNUR-{issued.strftime('%Y%m%d')}-001"]
+    ]
+    
+    client_table = Table(client_data, colWidths=[80, 400])
+    client_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ]))
+    story.append(client_table)
+    story.append(Spacer(1, 20))
+    
+    # Load Audit
+    story.append(Paragraph("LOAD AUDIT SUMMARY", heading_style))
+    load_data = [["Appliance", "Wattage (W)", "Qty", "Total Watt", "Hours/Day", "Wh/Day"]]
+    
+    for item in quote["load_data"]:
+        load_data.append([
+            item['appliance'],
+            f"{item['watt']:,.1f}",
+            str(item['quantity']),
+            f"{item['total_watt']:,.1f}",
+            str(item['hours']),
+            f"{item['wh']:,.1f}"
+        ])
+    
+    load_data.append([
+        "TOTAL", "", "", f"{total_watt:,.1f}", "", f"{total_wh:,.1f}"
+    ])
+    
+    load_table = Table(load_data, colWidths=[120, 60, 40, 60, 60, 60])
+    load_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFD700')),
+        ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    story.append(load_table)
+    story.append(Spacer(1, 20))
+    
+    # System Sizing
+    story.append(Paragraph("SYSTEM SIZING & COMPONENTS", heading_style))
+    sizing_data = [
+        ["Parameter", "Value", "Unit", "Details"],
+        ["Total Energy Demand", f"{total_wh:,.0f}", "Wh/day", "Daily consumption"],
+        ["Backup Time", f"{backup_time}", "hours", "Required autonomy"],
+        ["Battery Capacity", f"{battery_capacity_ah:,.0f}", "Ah", f"At {battery_voltage}V, {dod_limit}% DoD"],
+        ["Battery System", f"{num_batteries:.1f}", "units", f"{battery_type}"],
+        ["Solar Capacity", f"{required_solar:,.0f}", "W", "Required array size"],
+        ["Solar Panels", f"{num_panels:.1f}", "units", f"{panel_type}"],
+        ["Charge Controller", f"{controller_current:.0f}", "A", f"At {battery_voltage}V"],
+        ["Inverter Size", f"{inverter_size:.0f}", "W", f"{selected_inverter}"],
+        ["System Voltage", f"{battery_voltage}", "V", "DC system voltage"]
+    ]
+    
+    sizing_table = Table(sizing_data, colWidths=[120, 80, 40, 180])
+    sizing_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ]))
+    story.append(sizing_table)
+    story.append(Spacer(1, 20))
+    
+    # Financial Analysis
+    story.append(Paragraph("FINANCIAL ANALYSIS", heading_style))
+    financial_data = [
+        ["Component", "Quantity", "Unit Price (₦)", "Total Cost (₦)"],
+        [battery_type, f"{num_batteries:.1f}", f"{battery_info['price']:,.0f}", f"{num_batteries * battery_info['price']:,.0f}"],
+        [panel_type, f"{num_panels:.1f}", f"{panel_info['price']:,.0f}", f"{num_panels * panel_info['price']:,.0f}"],
+        [selected_inverter, "1", f"{inverter_info['price']:,.0f}", f"{inverter_info['price']:,.0f}"],
+        ["Installation & Misc", "1", f"Est. {INSTALLATION_COST:,}", f"{INSTALLATION_COST:,}"],
+        ["TOTAL SYSTEM COST", "", "", f"₦{total_cost + INSTALLATION_COST:,.0f}"]
+    ]
+    
+    financial_table = Table(financial_data, colWidths=[150, 50, 80, 100])
+    financial_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFD700')),
+        ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    story.append(financial_table)
+    story.append(Spacer(1, 20))
+    
+    # ROI Analysis
+    roi_data = [
+        ["Monthly Savings", f"₦{monthly_savings:,.0f}"],
+        ["Annual Savings", f"₦{monthly_savings * 12:,.0f}"],
+        ["Payback Period", f"{payback_period:.1f} years"],
+        [f"ROI over {system_lifespan} years", f"{roi:.0f}%"],
+        ["Lifetime Savings", f"₦{total_savings:,.0f}"]
+    ]
+    
+    roi_table = Table(roi_data, colWidths=[150, 100])
+    roi_table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+    story.append(roi_table)
+    story.append(Spacer(1, 30))
+    
+    # Terms and Conditions
+    story.append(Paragraph("TERMS & CONDITIONS", heading_style))
+    terms_text = """
+    <b>Quote Validity:</b> 30 days from date of issue<br/>
+    <b>Warranty:</b> Equipment as per manufacturer warranty + 1 year workmanship<br/>
+    <b>Payment Terms:</b> 50% advance, 50% upon completion<br/>
+    <b>Installation Timeline:</b> 5-7 working days after material availability<br/>
+    <b>Service:</b> 6 months free maintenance included<br/>
+    """
+    story.append(Paragraph(terms_text, normal_style))
+    story.append(Spacer(1, 20))
+    
+    # Footer
+    footer_text = f"""
+    {COMPANY} | {MOTTO} | {PHONE} | {EMAIL} | {WEBSITE}<br/>
+    {ADDRESS}<br/>
+    {BUSINESS_NUMBER} | {CAC_REGISTRATION}<br/>
+    <i>Thank you for choosing Annur Tech - Powering Nigeria's Future</i>
+    """
+    story.append(Paragraph(footer_text, normal_style))
+    
+    watch.lap("pdf_story")
+    doc.build(story)
+    watch.lap("pdf_build")
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,359 @@
+"""Local HTTP API for instant quotes, for the website and field agents' phones.
+
+    python quote_api.py --port 8502
+    python quote_api.py --load-test 2000 -c 16
+
+POST /quote takes one quote in the batch_quotes.py JSON format (client fields,
+a "loads" list of {appliance, watt, quantity, hours} and optional settings
+keys) and returns the system sizing, cost and ROI as JSON. POST /quote.pdf
+takes the same body and returns the quotation PDF. GET /stats reports request
+counts, throughput and latency percentiles.
+
+--load-test starts a server in a subprocess (or targets --url), sends
+concurrent quote requests and reports throughput and latency.
+"""
+import argparse
+import http.client
+import json
+import math
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from batch_quotes import parse_job
+from catalog import SYSTEM_VOLTAGES, current_catalog
+from metrics import Metrics
+from pdf_jobs import QueueFull, pdf_queue
+from portfolio import size_sites
+from quotation import DEFAULT_SETTINGS, prepare_quote
+from sizing import INSTALLATION_COST
+
+# Requests arriving while a batch is being sized queue up and are sized
+# together in the next vectorized pass, so a lone request is never held back
+# and a burst costs about as much as a single request. BATCH_WINDOW optionally
+# waits a little longer after the first request to gather more.
+
+HOST = "127.0.0.1"
+PORT = 8502
+MAX_BATCH = 512
+BATCH_WINDOW = 0.0  # seconds
+MAX_BODY = 1 << 20
+PDF_TIMEOUT = 60
+# Settings the sizing formulas divide by
+DIVISOR_SETTINGS = ("battery_voltage", "dod_limit", "temperature_factor", "sun_hours", "system_efficiency")
+
+
+class QuoteBatcher:
+    """Sizes concurrently submitted jobs together in one size_sites() call per batch."""
+
+    def __init__(self, max_batch=MAX_BATCH, window=BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.window = window
+        self.batches = 0
+        self.sized = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="quote-batcher", daemon=True)
+        self._thread.start()
+
+    def size(self, job, timeout=None):
+        """Sizing result for one job (see portfolio.size_sites), blocking until its batch is done."""
+        future = Future()
+        self._queue.put((job, future))
+        return future.result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                sites = size_sites([job for job, _ in batch])
+            except Exception:
+                # Size the jobs one at a time, so only the one that fails gets the error
+                for job, future in batch:
+                    try:
+                        future.set_result(size_sites([job])[0])
+                    except Exception as exc:
+                        future.set_exception(exc)
+            else:
+                for (_, future), site in zip(batch, sites):
+                    future.set_result(site)
+            self.batches += 1
+            self.sized += len(batch)
+
+
+def check_job(job):
+    """Raise ValueError for a job the sizing can't handle.
+
+    Names must be strings, loads and numeric settings finite and non-negative,
+    the DIVISOR_SETTINGS non-zero and battery_voltage one of SYSTEM_VOLTAGES.
+    """
+    for field, value in job["client"].items():
+        if not isinstance(value, str):
+            raise ValueError(f"{field} must be a string")
+    for name, value in job["settings"].items():
+        if isinstance(DEFAULT_SETTINGS[name], str):
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a component name")
+        elif not math.isfinite(value) or value < 0:
+            raise ValueError(f"{name} must be a finite, non-negative number")
+        elif name == "battery_voltage" and value not in SYSTEM_VOLTAGES:
+            raise ValueError(f"battery_voltage must be one of {', '.join(map(str, SYSTEM_VOLTAGES))}")
+        elif name in DIVISOR_SETTINGS and value == 0:
+            raise ValueError(f"{name} must be greater than zero")
+    for i, item in enumerate(job["loads"]):
+        if not isinstance(item["appliance"], str):
+            raise ValueError(f"loads[{i}].appliance must be a string")
+        for field in ("watt", "quantity", "hours"):
+            if not math.isfinite(item[field]) or item[field] < 0:
+                raise ValueError(f"loads[{i}].{field} must be a finite, non-negative number")
+
+
+def _finite(value):
+    # JSON has no infinity (e.g. the payback period of a zero load)
+    return value if not isinstance(value, float) or math.isfinite(value) else None
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so agents' apps can reuse a connection
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    server_version = "AnnurTechQuoteAPI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body, allow_nan=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_job(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            raise ValueError(f"Request body over {MAX_BODY} bytes")
+        record = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(record, dict) or not isinstance(record.get("loads"), list):
+            raise ValueError('Expected a JSON object with a "loads" list')
+        job = parse_job(record)
+        check_job(job)
+        return job
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == "/stats":
+            self._send(200, self.server.stats())
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path not in ("/quote", "/quote.pdf"):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        self.server.count(path)
+        with self.server.metrics.span(path):
+            try:
+                job = self._read_job()
+            except (KeyError, TypeError, ValueError) as e:
+                self._send(400, {"error": f"Invalid quote request: {e!r}"})
+                return
+            try:
+                if path == "/quote":
+                    self._quote(job)
+                else:
+                    self._quote_pdf(job)
+            except Exception as e:
+                self._send(500, {"error": f"Quote failed: {e!r}"})
+
+    def _quote(self, job):
+        site = self.server.batcher.size(job)
+        if site["error"]:
+            self._send(400, {"error": site["error"]})
+            return
+        result = {key: _finite(value) for key, value in site.items() if key not in ("site", "error")}
+        result["client_name"] = job["client"]["client_name"]
+        result["installation_cost"] = INSTALLATION_COST
+        self._send(200, result)
+
+    def _quote_pdf(self, job):
+        try:
+            quote = prepare_quote(job["client"], job["loads"], job["settings"])
+        except KeyError as e:
+            self._send(400, {"error": f"Unknown component {e}"})
+            return
+        try:
+            pdf = pdf_queue.wait(pdf_queue.submit(quote), timeout=PDF_TIMEOUT)
+        except QueueFull as e:
+            self._send(503, {"error": str(e)})
+            return
+        self._send(200, pdf, "application/pdf")
+
+
+class QuoteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=(HOST, PORT), max_batch=MAX_BATCH, window=BATCH_WINDOW, verbose=False):
+        super().__init__(address, QuoteHandler)
+        self.verbose = verbose
+        self.batcher = QuoteBatcher(max_batch, window)
+        self.metrics = Metrics(always=True)  # latency percentiles over the most recent requests
+        self.requests = Counter()
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def stats(self):
+        """Requests, throughput and latency per endpoint since the server started, plus batching."""
+        uptime = time.time() - self.started
+        endpoints = [dict(row, requests=self.requests[row["section"]], per_second=self.requests[row["section"]] / uptime)
+                     for row in self.metrics.stats()]
+        return {"uptime_s": uptime, "endpoints": endpoints, "batches": self.batcher.batches,
+                "mean_batch": self.batcher.sized / self.batcher.batches if self.batcher.batches else 0.0}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def load_test(url, requests=1000, concurrency=16, seed=0):
+    """Send `requests` POST /quote calls from `concurrency` keep-alive clients; return throughput and latency."""
+    parts = urllib.parse.urlsplit(url)
+    appliances = list(current_catalog().appliances.items())
+    rng = random.Random(seed)
+    bodies = [json.dumps({"client_name": f"Load test {i}", "project_location": "Lagos",
+                          "loads": [{"appliance": name, "watt": watt, "quantity": rng.randint(1, 4),
+                                     "hours": rng.randint(1, 12)}
+                                    for name, watt in rng.sample(appliances, rng.randint(1, 8))]}).encode("utf-8")
+              for i in range(min(requests, 200))]
+    latencies, errors = [], []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = time.perf_counter()
+            connection.request("POST", "/quote", bodies[i % len(bodies)], {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status != 200:
+                    errors.append(response.status)
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {"requests": len(latencies), "errors": len(errors), "seconds": seconds,
+            "per_second": len(latencies) / seconds, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def _wait_for_server(url, timeout=30):
+    parts = urllib.parse.urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+            connection.request("GET", "/stats")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve instant quotes over HTTP, or load-test the service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="most requests sized in one pass")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW,
+                        help="seconds to wait for more requests after the first of a batch")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    parser.add_argument("--load-test", type=int, metavar="N", help="send N quote requests and report")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="concurrent load-test clients")
+    parser.add_argument("--url", help="load-test this running server instead of starting one")
+    args = parser.parse_args(argv)
+
+    if args.load_test is None:
+        server = QuoteServer((args.host, args.port), args.max_batch, args.batch_window, args.verbose)
+        print(f"Serving quotes on http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://{HOST}:{port}"
+        server = subprocess.Popen([sys.executable, __file__, "--host", HOST, "--port", str(port),
+                                   "--max-batch", str(args.max_batch), "--batch-window", str(args.batch_window)])
+    try:
+        _wait_for_server(url)
+        result = load_test(url, args.load_test, args.concurrency)
+        parts = urllib.parse.urlsplit(url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        connection.request("GET", "/stats")
+        stats = json.loads(connection.getresponse().read())
+        connection.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(f"{result['requests']:,} quotes from {args.concurrency} clients in {result['seconds']:.2f} s: "
+          f"{result['per_second']:,.0f} quotes/s, latency p50 {result['p50_ms']:.1f} ms, "
+          f"p95 {result['p95_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms")
+    print(f"Server sized them in {stats['batches']:,} batches ({stats['mean_batch']:.1f} quotes per batch)")
+    if result["errors"]:
+        print(f"{result['errors']} requests failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
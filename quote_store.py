@@ -0,0 +1,155 @@
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import threading
+
+# On-disk quote history behind "Save Configuration". One row per saved quote:
+# indexed client columns for search, plus the load list, sizing settings and
+# bill of materials as JSON so a quote reopens with a single primary-key read.
+
+QUOTE_DB = os.environ.get("SOLAR_QUOTE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "quotes.db"))
+PAGE_SIZE = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    client_name TEXT NOT NULL COLLATE NOCASE,
+    client_phone TEXT NOT NULL COLLATE NOCASE,
+    client_email TEXT NOT NULL,
+    client_address TEXT NOT NULL,
+    project_location TEXT NOT NULL,
+    total_watt REAL NOT NULL,
+    total_wh REAL NOT NULL,
+    total_cost REAL NOT NULL,
+    loads TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    bom TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_client_name ON quotes (client_name);
+CREATE INDEX IF NOT EXISTS idx_quotes_client_phone ON quotes (client_phone);
+CREATE INDEX IF NOT EXISTS idx_quotes_location_date ON quotes (project_location, created_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_created_at ON quotes (created_at);
+"""
+
+SUMMARY_COLUMNS = ("id", "created_at", "client_name", "client_phone", "project_location", "total_wh", "total_cost")
+
+
+def _json(value):
+    return json.dumps(value, default=lambda v: v.item() if hasattr(v, "item") else str(v))
+
+
+class QuoteStore:
+    def __init__(self, path=QUOTE_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; Streamlit runs each session on its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save(self, client, load_data, settings, bom, total_cost, created_at=None):
+        """Store a quote and return its ID."""
+        created_at = (created_at or datetime.datetime.now()).isoformat(timespec="seconds")
+        loads = [{k: item[k] for k in ("appliance", "watt", "quantity", "hours")} for item in load_data]
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO quotes (created_at, client_name, client_phone, client_email, client_address,"
+                " project_location, total_watt, total_wh, total_cost, loads, settings, bom)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (created_at, client.get("client_name", ""), client.get("client_phone", ""),
+                 client.get("client_email", ""), client.get("client_address", ""),
+                 client.get("project_location", ""),
+                 float(sum(item["total_watt"] for item in load_data)), float(sum(item["wh"] for item in load_data)),
+                 float(total_cost), _json(loads), _json(settings), _json(bom)))
+            return cursor.lastrowid
+
+    def get(self, quote_id):
+        """The full saved quote, or None."""
+        row = self._connect().execute("SELECT * FROM quotes WHERE id = ?", (quote_id,)).fetchone()
+        if row is None:
+            return None
+        quote = dict(row)
+        for field in ("loads", "settings", "bom"):
+            quote[field] = json.loads(quote[field])
+        return quote
+
+    def search(self, text="", location=None, date_from=None, date_to=None, page=1, page_size=PAGE_SIZE):
+        """Newest-first page of quote summaries matching the filters, plus the total match count.
+
+        `text` matches the start of the client name or phone number.
+        """
+        where, params = [], []
+        if text:
+            # Prefix LIKE on NOCASE columns can use the name and phone indexes
+            pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where.append("(client_name LIKE ? ESCAPE '\\' OR client_phone LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        if location:
+            where.append("project_location = ?")
+            params.append(location)
+        if date_from:
+            where.append("created_at >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            where.append("created_at < ?")
+            params.append((date_to + datetime.timedelta(days=1)).isoformat())
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM quotes{clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM quotes{clause}"
+            " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            params + [page_size, (max(page, 1) - 1) * page_size]).fetchall()
+        return [dict(row) for row in rows], total
+
+    def iter_quotes(self, with_email=False, chunk_size=100):
+        """Every saved quote, oldest first, in lists of up to `chunk_size` (optionally only those with an email)."""
+        conn = self._connect()
+        email_clause = " AND client_email != ''" if with_email else ""
+        last_id = 0
+        while True:
+            rows = conn.execute(f"SELECT id FROM quotes WHERE id > ?{email_clause} ORDER BY id LIMIT ?",
+                                (last_id, chunk_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            yield [self.get(row["id"]) for row in rows]
+
+    def reprice(self, catalog, date=None, quote_ids=None):
+        """Rewrite saved bills of materials at catalog prices from `date` (default: current prices).
+
+        Reprices every quote, or just `quote_ids`, in one transaction and returns the number updated.
+        """
+        conn = self._connect()
+        if quote_ids is None:
+            rows = conn.execute("SELECT id, bom FROM quotes")
+        else:
+            ids = list(quote_ids)
+            rows = conn.execute(f"SELECT id, bom FROM quotes WHERE id IN ({', '.join('?' * len(ids))})", ids)
+        updates = []
+        for row in rows:
+            bom = catalog.reprice(json.loads(row["bom"]), date)
+            total_cost = sum(line["quantity"] * line["unit_price"] for line in bom)
+            updates.append((_json(bom), float(total_cost), row["id"]))
+        with conn:
+            conn.executemany("UPDATE quotes SET bom = ?, total_cost = ? WHERE id = ?", updates)
+        return len(updates)
+
+
+@functools.lru_cache(maxsize=None)
+def open_store(path=QUOTE_DB):
+    """Shared store per database file, so every session reuses one instance."""
+    return QuoteStore(path)
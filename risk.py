@@ -0,0 +1,81 @@
+import numpy as np
+
+# Monte Carlo view of the Financial Analysis block.
+#
+# Every scenario draws its own long-run tariff escalation, naira inflation,
+# average sun hours and battery cycle life. All scenarios are evaluated as
+# (scenarios, years) float32 arrays in a single pass; nothing loops per
+# scenario, and the NPV uses the closed-form geometric sum so only the payback
+# search needs the per-year cash position.
+
+SCENARIOS = 100_000
+CYCLES_PER_YEAR = 365  # one full battery cycle a day
+PERCENTILES = (10, 50, 90)
+FAN_SAMPLE = 10_000  # scenarios kept for the cumulative-cash fan chart
+
+DEFAULT_ASSUMPTIONS = {
+    "tariff_escalation": 15.0,  # % per year
+    "tariff_escalation_sd": 10.0,
+    "inflation": 20.0,  # % per year, also used as the discount rate
+    "inflation_sd": 5.0,
+    "sun_hours_sd": 0.5,  # hours, uncertainty of the long-run site average
+    "cycle_life_sd": 15.0,  # % of rated life_cycles
+}
+
+
+def simulate_financials(total_wh, total_cost, electricity_rate, system_lifespan, sun_hours,
+                        battery_cost, life_cycles, scenarios=SCENARIOS, seed=None, **assumptions):
+    """Draw `scenarios` cash-flow paths and return per-scenario NPV and payback.
+
+    Also returns the (years, scenarios) cumulative cash position for fan charts.
+    """
+    a = dict(DEFAULT_ASSUMPTIONS, **assumptions)
+    total_wh, total_cost, battery_cost = float(total_wh), float(total_cost), float(battery_cost)
+    electricity_rate, sun_hours, life_cycles = float(electricity_rate), float(sun_hours), float(life_cycles)
+    years = int(system_lifespan)
+    rng = np.random.default_rng(seed)
+    year = np.arange(1, years + 1, dtype=np.float32)
+
+    draws = rng.standard_normal((4, scenarios), np.float32)
+    escalation = 1 + (a["tariff_escalation"] + a["tariff_escalation_sd"] * draws[0]) / 100
+    inflation = 1 + (a["inflation"] + a["inflation_sd"] * draws[1]) / 100
+    # A dull site means the array covers less of the load; the rest is bought from the grid
+    coverage = np.clip(1 + a["sun_hours_sd"] * draws[2] / sun_hours, 0.0, 1.0)
+    life_years = life_cycles * np.clip(1 + a["cycle_life_sd"] / 100 * draws[3], 0.2, None) / CYCLES_PER_YEAR
+    first_year_savings = (total_wh / 1000) * 365 * electricity_rate * coverage
+
+    # Battery bank is replaced (at inflated prices) each time its cycle life runs out,
+    # except in the final year of service
+    replaced = np.floor(year[None, :] / life_years[:, None])
+    replaced[:, -1] = replaced[:, -2] if years > 1 else 0
+    replacements = replaced.copy()
+    replacements[:, 1:] -= replaced[:, :-1]
+
+    savings = first_year_savings[:, None] * escalation[:, None] ** year
+    cash_flow = savings - replacements * (battery_cost * inflation[:, None] ** year)
+    cumulative = np.cumsum(cash_flow, axis=1)
+
+    # Discounted at inflation, replacements cost their base price and savings grow by escalation / inflation
+    growth = escalation / inflation
+    flat = np.abs(growth - 1) < 1e-6
+    discounted = np.where(flat, years, growth * (growth ** years - 1) / np.where(flat, 1, growth - 1))
+    npv = first_year_savings * discounted - battery_cost * replaced[:, -1] - total_cost
+
+    # Payback: first year the cumulative cash covers the outlay, interpolated within that year
+    paid = cumulative >= total_cost
+    first = paid.argmax(axis=1)
+    rows = np.arange(scenarios)
+    before = np.where(first > 0, cumulative[rows, first - 1], 0.0)
+    fraction = (total_cost - before) / np.maximum(cumulative[rows, first] - before, 1e-9)
+    payback = np.where(paid.any(axis=1), first + np.clip(fraction, 0.0, 1.0), np.inf)
+
+    return {
+        "npv": npv.astype(np.float64),
+        "payback_period": payback.astype(np.float64),
+        "cumulative_cash": (cumulative[:FAN_SAMPLE] - total_cost).T,
+    }
+
+
+def percentiles(values, q=PERCENTILES, axis=None):
+    # "nearest" keeps never-paid-back (inf) scenarios from turning into NaN
+    return np.percentile(values, q, axis=axis, method="nearest")
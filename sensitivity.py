@@ -0,0 +1,59 @@
+import numpy as np
+
+from cache import rerun_cache
+from sizing import size_systems, financials
+
+# Two-way sensitivity sweeps. The two swept inputs are laid out as a column and
+# a row vector, so the sizing engine broadcasts them into the full grid in one
+# evaluation. Results are memoised on the full set of inputs in the shared
+# rerun cache.
+
+# Sweepable inputs: label and range, matching the app's slider bounds
+SWEEP_INPUTS = {
+    "sun_hours": ("Sun hours per day", 3.0, 8.0),
+    "system_efficiency": ("System efficiency (%)", 50, 95),
+    "dod_limit": ("Depth of Discharge (%)", 50, 100),
+    "backup_time": ("Backup time (hours)", 1, 24),
+    "current_electricity_rate": ("Electricity cost (₦/kWh)", 25, 100),
+}
+
+SWEEP_OUTPUTS = ("total_cost", "payback_period", "num_panels")
+
+_SIZING_INPUTS = ("total_wh", "total_watt", "backup_time", "battery_voltage", "dod_limit", "temperature_factor",
+                  "sun_hours", "system_efficiency", "battery_capacity", "battery_price", "panel_vmp", "panel_price",
+                  "inverter_price")
+
+
+def sweep(base, x_name, y_name, resolution=200):
+    """Evaluate SWEEP_OUTPUTS over a resolution x resolution grid of two inputs.
+
+    `base` holds every sizing input plus current_electricity_rate and
+    system_lifespan. Returns the axis values and read-only (y, x) arrays.
+    """
+    if x_name == y_name:
+        raise ValueError("Choose two different inputs to sweep")
+    return _sweep({k: float(v) for k, v in base.items()}, x_name, y_name, int(resolution))
+
+
+@rerun_cache.memoize("sensitivity_sweep")
+def _sweep(base, x_name, y_name, resolution):
+    params = dict(base)
+    _, x_lo, x_hi = SWEEP_INPUTS[x_name]
+    _, y_lo, y_hi = SWEEP_INPUTS[y_name]
+    x = np.linspace(x_lo, x_hi, resolution)
+    y = np.linspace(y_lo, y_hi, resolution)
+    params[x_name] = x[None, :]
+    params[y_name] = y[:, None]
+
+    sizing = size_systems(**{k: params[k] for k in _SIZING_INPUTS})
+    finance = financials(params["total_wh"], sizing["total_cost"], params["current_electricity_rate"],
+                         params["system_lifespan"])
+    grid = np.broadcast_shapes(x[None, :].shape, y[:, None].shape)
+    result = {"x": x, "y": y}
+    for name in SWEEP_OUTPUTS:
+        values = np.array(np.broadcast_to(sizing[name] if name in sizing else finance[name], grid))
+        values[~np.isfinite(values)] = np.nan
+        result[name] = values
+    for values in result.values():
+        values.setflags(write=False)
+    return result
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Sizing engine shared by the Streamlit app and headless jobs.
+# Every function accepts scalars or NumPy arrays and broadcasts them, so one
+# call can size a single client or tens of thousands of load profiles.
+
+CONTROLLER_MARGIN = 1.25  # 25% safety margin
+INVERTER_MARGIN = 1.3  # 30% safety margin for Nigerian power conditions
+INSTALLATION_COST = 150000  # Installation & misc, added on the quotation
+
+SIZING_FIELDS = (
+    "battery_capacity_ah",
+    "num_batteries",
+    "battery_cost",
+    "required_solar",
+    "num_panels",
+    "panel_cost",
+    "controller_current",
+    "inverter_size",
+    "total_cost",
+)
+
+FINANCIAL_FIELDS = ("monthly_savings", "total_savings", "payback_period", "roi")
+
+
+def _f64(value):
+    return np.asarray(value, dtype=np.float64)
+
+
+def battery_bank(total_wh, backup_time, battery_voltage, dod_limit, temperature_factor, battery_capacity):
+    total_wh, backup_time, battery_voltage = _f64(total_wh), _f64(backup_time), _f64(battery_voltage)
+    dod_limit, temperature_factor = _f64(dod_limit), _f64(temperature_factor)
+    battery_capacity_ah = (total_wh * backup_time) / (battery_voltage * (dod_limit / 100) * (temperature_factor / 100))
+    num_batteries = battery_capacity_ah / _f64(battery_capacity)
+    return battery_capacity_ah, num_batteries
+
+
+def solar_array(total_wh, sun_hours, system_efficiency, battery_voltage, panel_vmp):
+    total_wh, sun_hours, system_efficiency = _f64(total_wh), _f64(sun_hours), _f64(system_efficiency)
+    battery_voltage, panel_vmp = _f64(battery_voltage), _f64(panel_vmp)
+    required_solar = total_wh / (sun_hours * (system_efficiency / 100))
+    num_panels = required_solar / panel_vmp * (battery_voltage / panel_vmp)
+    controller_current = (required_solar * CONTROLLER_MARGIN) / battery_voltage
+    return required_solar, num_panels, controller_current
+
+
+def inverter_rating(total_watt):
+    return _f64(total_watt) * INVERTER_MARGIN
+
+
+def system_cost(num_batteries, battery_price, num_panels, panel_price, inverter_price):
+    return (_f64(num_batteries) * _f64(battery_price) +
+            _f64(num_panels) * _f64(panel_price) +
+            _f64(inverter_price))
+
+
+def size_systems(total_wh, total_watt, backup_time, battery_voltage, dod_limit, temperature_factor,
+                 sun_hours, system_efficiency, battery_capacity, battery_price, panel_vmp, panel_price,
+                 inverter_price):
+    """Size every input combination in one broadcast pass.
+
+    Returns a dict keyed by SIZING_FIELDS; all arrays share the broadcast shape
+    of the inputs.
+    """
+    battery_capacity_ah, num_batteries = battery_bank(
+        total_wh, backup_time, battery_voltage, dod_limit, temperature_factor, battery_capacity)
+    required_solar, num_panels, controller_current = solar_array(
+        total_wh, sun_hours, system_efficiency, battery_voltage, panel_vmp)
+    inverter_size = inverter_rating(total_watt)
+    battery_price, panel_price = _f64(battery_price), _f64(panel_price)
+    battery_cost = num_batteries * battery_price
+    panel_cost = num_panels * panel_price
+    total_cost = battery_cost + panel_cost + _f64(inverter_price)
+
+    values = (battery_capacity_ah, num_batteries, battery_cost, required_solar, num_panels,
+              panel_cost, controller_current, inverter_size, total_cost)
+    shape = np.broadcast_shapes(*(v.shape for v in values))
+    return {name: np.broadcast_to(v, shape) for name, v in zip(SIZING_FIELDS, values)}
+
+
+def financials(total_wh, total_cost, electricity_rate, system_lifespan):
+    total_wh, total_cost = _f64(total_wh), _f64(total_cost)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        monthly_savings = (total_wh / 1000) * 30 * _f64(electricity_rate)
+        total_savings = monthly_savings * 12 * _f64(system_lifespan)
+        payback_period = total_cost / (monthly_savings * 12)
+        roi = ((total_savings - total_cost) / total_cost) * 100
+    return dict(zip(FINANCIAL_FIELDS, (monthly_savings, total_savings, payback_period, roi)))
@@ -1,112 +1,87 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 import datetime
-import base64
-
-try:
-    from reportlab.lib.pagesizes import A4, letter
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-
-# Branding info - Enhanced with Nigerian context
-COMPANY = "ANNUR TECH SOLAR SOLUTIONS"
-MOTTO = "Illuminating Nigeria's Future"
-ADDRESS = "No 6 Kolo Drive, Behind Zuma Barrack, Tafa LGA, Niger State, Nigeria"
-PHONE = "+234 905 169 3000"
-EMAIL = "albataskumyjr@gmail.com"
-WEBSITE = "www.annurtech.ng"
-BUSINESS_NUMBER = "BN: 2984173"
-CAC_REGISTRATION = "CAC/RC: 1847263"
-
-# Nigerian-specific component database with current market prices (Naira)
-NIGERIAN_SOLAR_PANELS = {
-    "Jinko Tiger 350W": {"price": 85000, "vmp": 35.5, "voc": 42.5, "efficiency": 19.5, "warranty": "25 years"},
-    "Canadian Solar 400W": {"price": 105000, "vmp": 37.2, "voc": 45.5, "efficiency": 20.1, "warranty": "25 years"},
-    "Trina Solar 450W": {"price": 125000, "vmp": 39.8, "voc": 48.2, "efficiency": 20.8, "warranty": "25 years"},
-    "LG Neon 2 380W": {"price": 145000, "vmp": 36.2, "voc": 43.8, "efficiency": 21.1, "warranty": "25 years"},
-}
-
-NIGERIAN_BATTERIES = {
-    "Trojan T-105 (225Ah)": {"price": 65000, "capacity": 225, "type": "Lead-acid", "voltage": 6, "life_cycles": 1500},
-    "Pylontech US2000 (200Ah)": {"price": 280000, "capacity": 200, "type": "Lithium", "voltage": 48, "life_cycles": 6000},
-    "Vision 6FM200D (200Ah)": {"price": 75000, "capacity": 200, "type": "Lead-acid", "voltage": 6, "life_cycles": 1200},
-    "BYD B-Box (200Ah)": {"price": 250000, "capacity": 200, "type": "Lithium", "voltage": 48, "life_cycles": 6000},
-}
-
-NIGERIAN_INVERTERS = {
-    "Growatt 3000W 24V": {"price": 185000, "power": 3000, "voltage": 24, "type": "Hybrid", "warranty": "5 years"},
-    "Victron 5000W 48V": {"price": 450000, "power": 5000, "voltage": 48, "type": "Hybrid", "warranty": "5 years"},
-    "SMA Sunny Boy 5000W": {"price": 520000, "power": 5000, "voltage": 48, "type": "Grid-tie", "warranty": "10 years"},
-}
-
-# Common Nigerian appliances with typical wattages
-NIGERIAN_APPLIANCES = {
-    "Ceiling Fan": 75,
-    "Standing Fan": 55,
-    "TV (32-inch LED)": 50,
-    "TV (42-inch LED)": 80,
-    "Refrigerator (Medium)": 150,
-    "Deep Freezer": 200,
-    "Air Conditioner (1HP)": 750,
-    "Air Conditioner (1.5HP)": 1100,
-    "Water Pump (1HP)": 750,
-    "Lighting (LED Bulb)": 10,
-    "Lighting (Fluorescent)": 40,
-    "Computer Desktop": 200,
-    "Laptop": 65,
-    "Decoder": 25,
-    "Home Theatre": 100,
-    "Washing Machine": 500,
-    "Electric Iron": 1000,
-    "Microwave Oven": 1000,
-    "Electric Kettle": 1500,
-}
+import io
+import os
+import time
 
-st.set_page_config(page_title="Annur Tech Solar Planner", layout="wide", page_icon="☀️")
+from batch_quotes import read_jobs
+from cache import rerun_cache
+from catalog import SYSTEM_VOLTAGES, PROJECT_LOCATIONS, current_catalog
+from charts import bar_chart, line_chart, pie_chart
+from irradiance import MONTHLY_FIELDS, SUN_HOURS_RANGE, TEMPERATURE_FACTOR_RANGE, climate_table
+from layout import MIN_TEMP, MAX_CELL_TEMP, string_layouts
+from load_store import LoadStore
+from mailer import open_mailer, quote_email
+from metrics import metrics
+from optimizer import pareto_front, cheapest_systems
+from pdf_jobs import QueueFull, pdf_queue, quote_key
+from portfolio import SITE_FIELDS, size_portfolio
+from quotation import (COMPANY, MOTTO, ADDRESS, PHONE, EMAIL, BUSINESS_NUMBER, CAC_REGISTRATION,
+                       CLIENT_FIELDS, DEFAULT_SETTINGS, bill_of_materials, build_quotation_pdf,
+                       default_settings)
+from quote_store import open_store
+from risk import simulate_financials, percentiles
+from sensitivity import SWEEP_INPUTS, sweep
+from simulation import HOURS_PER_YEAR, daily_load_profile, solar_profile, simulate, minimum_reliable_size
+from sizing import battery_bank, solar_array, inverter_rating, system_cost, financials
 
-# Custom CSS for Nigerian color scheme
-st.markdown(f"""
+# pandas, reportlab and the meter importer are imported where they are first used, and the
+# heavier expanders below only render once opened, so a fresh session's first run stays cheap (check_startup.py)
+
+# Timing spans are recorded for the whole server with SOLAR_PROFILE=1, or for one session opened with
+# ?profile=<SOLAR_PROFILE_TOKEN>, which also shows the performance page (env var only when no token is configured)
+PROFILE_TOKEN = os.environ.get("SOLAR_PROFILE_TOKEN", "")
+EMAIL_PDF_TIMEOUT = 60  # seconds to wait for an emailed quotation's PDF
+rerun_watch, section_watch = metrics.stopwatch(), metrics.stopwatch()
+
+# Built once per process; only the st.markdown call below repeats on each rerun
+APP_CSS = """
 <style>
-    .main .block-container {{
+    .main .block-container {
         padding-top: 2rem;
-    }}
-    .stApp {{
+    }
+    .stApp {
         background-color: #f8f9fa;
-    }}
-    .green-header {{
+    }
+    .green-header {
         background-color: #006400;
         color: white;
         padding: 10px;
         border-radius: 5px;
         text-align: center;
-    }}
-    .nigerian-flag {{
+    }
+    .nigerian-flag {
         background: linear-gradient(90deg, #008751 33%, white 33%, white 66%, #008751 66%);
         color: white;
         padding: 5px;
         text-align: center;
         border-radius: 3px;
-    }}
-    .price-tag {{
+    }
+    .price-tag {
         background-color: #FFD700;
         color: #000;
         padding: 2px 5px;
         border-radius: 3px;
         font-weight: bold;
-    }}
+    }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.set_page_config(page_title="Annur Tech Solar Planner", layout="wide", page_icon="☀️")
+
+# Custom CSS for Nigerian color scheme
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
+profile_param = st.query_params.get("profile")
+show_performance = metrics.always or bool(PROFILE_TOKEN and profile_param == PROFILE_TOKEN)
+metrics.enable(show_performance)
+section_watch.lap("page_setup")
+
+# Shared component catalog; re-read only when the data file changes
+catalog = current_catalog()
+section_watch.lap("catalog")
 
 # App header with Nigerian branding
 col1, col2, col3 = st.columns([1, 3, 1])
@@ -114,13 +89,21 @@ with col2:
     st.markdown(f'<div class="nigerian-flag"><h1>⚡ {COMPANY}</h1></div>', unsafe_allow_html=True)
     st.markdown(f'<h3 style="text-align: center; color: #006400;">{MOTTO}</h3>', unsafe_allow_html=True)
 
+# Fill sun hours and temperature derating from the project location's weather data (runs before the next rerun)
+def apply_location_climate():
+    climate = climate_table()
+    location = st.session_state.project_location
+    if location in climate:
+        st.session_state.update(climate.design_inputs(location))
+
 # Client Information Section
 st.sidebar.markdown(f'<div class="green-header"><h3>👤 Client Information</h3></div>', unsafe_allow_html=True)
-client_name = st.sidebar.text_input("Full Name")
-client_address = st.sidebar.text_area("Address")
-client_phone = st.sidebar.text_input("Phone Number")
-client_email = st.sidebar.text_input("Email Address")
-project_location = st.sidebar.selectbox("Project Location", ["Abuja", "Lagos", "Kano", "Port Harcourt", "Kaduna", "Other"])
+client_name = st.sidebar.text_input("Full Name", key="client_name")
+client_address = st.sidebar.text_area("Address", key="client_address")
+client_phone = st.sidebar.text_input("Phone Number", key="client_phone")
+client_email = st.sidebar.text_input("Email Address", key="client_email")
+project_location = st.sidebar.selectbox("Project Location", PROJECT_LOCATIONS, key="project_location",
+                                        on_change=apply_location_climate)
 
 # Load Audit Section with Nigerian appliances
 st.markdown(f'<div class="green-header"><h3>🔋 Load Audit & Energy Assessment</h3></div>', unsafe_allow_html=True)
@@ -128,8 +111,8 @@ st.markdown(f'<div class="green-header"><h3>🔋 Load Audit & Energy Assessment<
 col1, col2 = st.columns(2)
 with col1:
     st.subheader("Quick Add Common Appliances")
-    selected_appliance = st.selectbox("Select common appliance", list(NIGERIAN_APPLIANCES.keys()))
-    appliance_wattage = st.number_input("Wattage (W)", value=NIGERIAN_APPLIANCES[selected_appliance])
+    selected_appliance = st.selectbox("Select common appliance", list(catalog.appliances.keys()))
+    appliance_wattage = st.number_input("Wattage (W)", value=catalog.appliances[selected_appliance])
     
 with col2:
     appliance_quantity = st.number_input("Quantity", 1, 100, 1)
@@ -151,65 +134,167 @@ with col4:
 
 add_custom = st.button("➕ Add Custom Appliance")
 
+# Meter or generator-log import for commercial sites
+st.subheader("Import Meter / Generator Log")
+meter_file = st.file_uploader("Interval readings CSV (timestamp plus kWh, Wh, kW or W column)", type=["csv"])
+meter_dayfirst = st.checkbox("Dates are day-first (DD/MM/YYYY)")
+import_meter = st.button("📥 Import Load Profile", disabled=meter_file is None)
+
 # Initialize session state
 if "load_data" not in st.session_state:
-    st.session_state.load_data = []
+    st.session_state.load_data = LoadStore()
+if "sun_hours" not in st.session_state:
+    apply_location_climate()
+# Sizing widgets take their defaults from session state so saved quotes can be reopened into them
+for setting, default in default_settings(catalog).items():
+    st.session_state.setdefault(setting, default)
+# Components dropped from the catalog by a reload fall back to the first one listed
+for setting, components in (("battery_type", catalog.batteries), ("panel_type", catalog.panels),
+                            ("selected_inverter", catalog.inverters)):
+    if st.session_state[setting] not in components:
+        st.session_state[setting] = next(iter(components))
 
 # Add appliances to load list
 if add_appliance and selected_appliance:
-    total_watt = appliance_wattage * appliance_quantity
-    daily_wh = total_watt * appliance_hours
-    st.session_state.load_data.append({
-        "appliance": selected_appliance,
-        "watt": appliance_wattage,
-        "quantity": appliance_quantity,
-        "total_watt": total_watt,
-        "hours": appliance_hours,
-        "wh": daily_wh
-    })
+    st.session_state.load_data.add(selected_appliance, appliance_wattage, appliance_quantity, appliance_hours)
     st.success(f"Added {appliance_quantity} × {selected_appliance}")
 
 if add_custom and custom_appliance:
-    total_watt = custom_watt * custom_quantity
-    daily_wh = total_watt * custom_hours
-    st.session_state.load_data.append({
-        "appliance": custom_appliance,
-        "watt": custom_watt,
-        "quantity": custom_quantity,
-        "total_watt": total_watt,
-        "hours": custom_hours,
-        "wh": daily_wh
-    })
+    st.session_state.load_data.add(custom_appliance, custom_watt, custom_quantity, custom_hours)
     st.success(f"Added {custom_quantity} × {custom_appliance}")
 
+# A meter log becomes one load row at the measured peak, running long enough to match the average daily energy
+if import_meter and meter_file is not None:
+    from meter_import import profile_meter_log
+
+    meter_progress = st.progress(0.0, text=f"Reading {meter_file.name}…")
+    try:
+        meter = profile_meter_log(meter_file, dayfirst=meter_dayfirst, progress=lambda done: meter_progress.progress(
+            done, text=f"Reading {meter_file.name}… {done:.0%}"))
+    except ValueError as e:
+        meter_progress.empty()
+        st.error(f"Could not import {meter_file.name}: {e}")
+    else:
+        meter_progress.empty()
+        metered_name = f"Metered load ({meter_file.name})"
+        st.session_state.load_data.add(metered_name, round(meter["peak_w"], 1), 1,
+                                       round(meter["average_daily_wh"] / meter["peak_w"], 2) if meter["peak_w"] else 0.0)
+        st.session_state.setdefault("metered_profiles", {})[metered_name] = meter["hourly_w"]
+        st.success(f"Imported {meter['rows']:,} readings over {meter['days']} days: "
+                   f"{meter['average_daily_wh'] / 1000:,.1f} kWh/day average, {meter['peak_w'] / 1000:,.2f} kW peak "
+                   f"on {meter['peak_at']:%d %b %Y %H:%M}")
+        fig_hourly = go.Figure(go.Bar(x=np.arange(24), y=meter["hourly_w"], marker_color="#008751"))
+        fig_hourly.update_layout(title="Metered Hourly Load Profile", xaxis_title="Hour of day",
+                                 yaxis_title="Average load (W)")
+        st.plotly_chart(fig_hourly, use_container_width=True)
+        daily_wh = meter["daily_wh"]
+        st.plotly_chart(line_chart(daily_wh.index.to_numpy(), {"Energy": daily_wh.to_numpy() / 1000},
+                                   "Metered Daily Energy", yaxis_title="kWh"), use_container_width=True)
+
+section_watch.lap("load_audit")
+
+# Table and charts for the load list, rebuilt only when the list changes. The charts total energy per
+# appliance group and per appliance (largest first, the rest folded into "Other"), so they stay small
+# however long the list grows.
+@rerun_cache.memoize("load_summary")
+def load_summary(load_data, catalog):
+    with metrics.span("load_table"):
+        df = load_data.to_frame()
+    with metrics.span("load_charts"):
+        appliances, wh = load_data.column("appliance"), load_data.column("wh")
+        groups = [catalog.appliance_groups.get(name, "Other") for name in appliances]
+        fig_pie = pie_chart(groups, wh, "Energy Consumption by Category")
+        fig_bar = bar_chart(appliances, wh, "Daily Energy Consumption (Wh)", yaxis_title="Wh")
+    # Plain text names in the editor so rows can be renamed freely
+    return df.astype({"appliance": object}), fig_pie, fig_bar
+
+# Apply row edits and deletions from the load table editor
+def apply_load_edits(editor_key):
+    store = st.session_state.load_data
+    changes = st.session_state[editor_key]
+    for index, edits in changes["edited_rows"].items():
+        edits = {k: v for k, v in edits.items() if k in ("appliance", "watt", "quantity", "hours") and v is not None}
+        if edits:
+            store.update(int(index), **edits)
+    for row in changes["added_rows"]:
+        if row.get("appliance"):
+            store.add(row["appliance"], row.get("watt") or 0, row.get("quantity") or 1, row.get("hours") or 0.0)
+    store.delete(*changes["deleted_rows"])
+
 # Display load summary
 if st.session_state.load_data:
     st.subheader("📊 Load Summary")
-    total_wh = sum(item["wh"] for item in st.session_state.load_data)
-    total_watt = sum(item["total_watt"] for item in st.session_state.load_data)
-    
-    df = pd.DataFrame(st.session_state.load_data)
+    total_wh = st.session_state.load_data.total_wh
+    total_watt = st.session_state.load_data.total_watt
+    df, fig_pie, fig_bar = load_summary(st.session_state.load_data, catalog)
     
     # Add energy consumption charts
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_pie = px.pie(df, values='wh', names='appliance', title='Energy Consumption by Appliance')
         st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
-        fig_bar = px.bar(df, x='appliance', y='wh', title='Daily Energy Consumption (Wh)')
         st.plotly_chart(fig_bar, use_container_width=True)
     
-    st.dataframe(df, use_container_width=True)
-    st.metric("Total Power Demand", f"{total_watt} W")
-    st.metric("Total Daily Energy Consumption", f"{total_wh} Wh")
+    # Editable table: change a row in place or select rows and delete them
+    editor_key = f"load_editor_{st.session_state.load_data.version}"
+    st.data_editor(df, key=editor_key, num_rows="dynamic", disabled=["total_watt", "wh"],
+                   on_change=apply_load_edits, args=(editor_key,), use_container_width=True)
+    st.metric("Total Power Demand", f"{total_watt:,.0f} W")
+    st.metric("Total Daily Energy Consumption", f"{total_wh:,.1f} Wh")
     
     # Clear button
     if st.button("🗑️ Clear All Items"):
-        st.session_state.load_data = []
+        st.session_state.load_data.clear()
         st.rerun()
 
+section_watch.lap("load_summary")
+
+# Push an optimizer result into the component selectboxes (runs before the next rerun)
+def apply_system(system):
+    st.session_state.battery_voltage = system["battery_voltage"]
+    st.session_state.battery_type = system["battery"]
+    st.session_state.panel_type = system["panel"]
+    st.session_state.selected_inverter = system["inverter"]
+
+@rerun_cache.memoize("optimizer")
+@metrics.timed("optimizer")
+def optimize(catalog, *sizing_args):
+    components = {"panels": catalog.panels, "batteries": catalog.batteries, "inverters": catalog.inverters}
+    return pareto_front(*sizing_args, **components), cheapest_systems(*sizing_args, limit=10, **components)
+
+@rerun_cache.memoize("string_layouts")
+@metrics.timed("string_layouts")
+def string_layout_table(catalog, required_solar, min_temp, max_cell_temp):
+    return string_layouts(required_solar, catalog.panels, catalog.controllers, min_temp=min_temp,
+                          max_cell_temp=max_cell_temp)
+
+@rerun_cache.memoize("year_simulation")
+@metrics.timed("year_simulation")
+def year_simulation(load_data, sun_hours, system_efficiency, pv_watts, usable_wh, pv_cost, battery_cost, reliability,
+                    metered_profiles=None, location=None):
+    # Imported meter rows follow their measured hourly shape instead of the assumed usage order
+    appliances, quantity = load_data.column("appliance"), load_data.column("quantity")
+    metered = np.zeros(len(load_data), dtype=bool)
+    daily = np.zeros(24)
+    for name, hourly_w in (metered_profiles or {}).items():
+        rows = appliances == name
+        metered |= rows
+        daily += hourly_w * quantity[rows].sum()
+    daily += daily_load_profile(load_data.column("total_watt")[~metered], load_data.column("hours")[~metered])
+    load_profile = np.resize(daily, HOURS_PER_YEAR)
+    # Measured hourly irradiance for the project location where weather data is installed
+    climate = climate_table()
+    pv_yield = climate.pv_yield(location, sun_hours) if location in climate else solar_profile(sun_hours)
+    year = simulate(load_profile, pv_yield, pv_watts, usable_wh, system_efficiency=system_efficiency)
+    best = minimum_reliable_size(load_profile, pv_yield, pv_watts, usable_wh, pv_cost, battery_cost,
+                                 reliability=reliability, system_efficiency=system_efficiency)
+    hours = np.datetime64(f"{datetime.date.today().year}-01-01T00") + np.arange(HOURS_PER_YEAR)
+    fig_year = line_chart(hours, {"Load": load_profile, "PV output": pv_yield * pv_watts * system_efficiency / 100},
+                          "Hourly Load and PV Output", yaxis_title="W")
+    return year, best, fig_year
+
 # System Sizing Section
 st.markdown(f'<div class="green-header"><h3>⚡ System Sizing & Component Selection</h3></div>', unsafe_allow_html=True)
 
@@ -218,18 +303,18 @@ if st.session_state.load_data:
     
     with col1:
         st.subheader("Battery System")
-        backup_time = st.slider("Backup time required (hours)", 1, 24, 5)
-        battery_voltage = st.selectbox("System voltage", [12, 24, 48], index=1)
-        dod_limit = st.slider("Depth of Discharge (%)", 50, 100, 80)
-        temperature_factor = st.slider("Temperature derating factor (%)", 80, 100, 90)
-        
-        # Advanced battery calculation
-        battery_capacity_ah = (total_wh * backup_time) / (battery_voltage * (dod_limit/100) * (temperature_factor/100))
+        backup_time = st.slider("Backup time required (hours)", 1, 24, key="backup_time")
+        battery_voltage = st.selectbox("System voltage", SYSTEM_VOLTAGES, key="battery_voltage")
+        dod_limit = st.slider("Depth of Discharge (%)", 50, 100, key="dod_limit")
+        temperature_factor = st.slider("Temperature derating factor (%)", *TEMPERATURE_FACTOR_RANGE, key="temperature_factor")
         
         # Select battery type
-        battery_type = st.selectbox("Battery technology", list(NIGERIAN_BATTERIES.keys()))
-        battery_info = NIGERIAN_BATTERIES[battery_type]
-        num_batteries = battery_capacity_ah / battery_info["capacity"]
+        battery_type = st.selectbox("Battery technology", list(catalog.batteries.keys()), key="battery_type")
+        battery_info = catalog.batteries[battery_type]
+        
+        # Advanced battery calculation
+        battery_capacity_ah, num_batteries = battery_bank(
+            total_wh, backup_time, battery_voltage, dod_limit, temperature_factor, battery_info["capacity"])
         
         st.metric("Required Battery Capacity", f"{battery_capacity_ah:.0f} Ah")
         st.metric("Number of Batteries Needed", f"{num_batteries:.1f}", 
@@ -238,39 +323,121 @@ if st.session_state.load_data:
     
     with col2:
         st.subheader("Solar Panel System")
-        sun_hours = st.slider("Sun hours per day (Nigeria average)", 3.0, 8.0, 5.0)
-        system_efficiency = st.slider("System efficiency (%)", 50, 95, 75)
-        panel_type = st.selectbox("Solar panel type", list(NIGERIAN_SOLAR_PANELS.keys()))
-        panel_info = NIGERIAN_SOLAR_PANELS[panel_type]
+        sun_hours = st.slider("Sun hours per day (Nigeria average)", *SUN_HOURS_RANGE, key="sun_hours")
+        if project_location in climate_table():
+            climate = dict(zip(MONTHLY_FIELDS, climate_table().monthly(project_location)[:12].T))
+            worst = int(climate["sun_hours"].argmin())
+            st.caption(f"📍 {project_location} weather data: {climate['sun_hours'].mean():.1f} h average, "
+                       f"lowest {climate['sun_hours'][worst]:.1f} h in {datetime.date(2000, worst + 1, 1):%B}, "
+                       f"{climate['temp_air'].mean():.0f} °C mean air temperature")
+        system_efficiency = st.slider("System efficiency (%)", 50, 95, key="system_efficiency")
+        panel_type = st.selectbox("Solar panel type", list(catalog.panels.keys()), key="panel_type")
+        panel_info = catalog.panels[panel_type]
         
-        # Advanced solar calculation
-        required_solar = total_wh / (sun_hours * (system_efficiency/100))
-        num_panels = required_solar / panel_info["vmp"] * (battery_voltage/panel_info["vmp"])
-        
-        # Charge controller calculation
-        controller_current = (required_solar * 1.25) / battery_voltage  # 25% safety margin
+        # Advanced solar and charge controller calculation
+        required_solar, num_panels, controller_current = solar_array(
+            total_wh, sun_hours, system_efficiency, battery_voltage, panel_info["vmp"])
         
         st.metric("Required Solar Capacity", f"{required_solar:.0f} W")
         st.metric("Number of Panels Needed", f"{num_panels:.1f}")
         st.metric("Estimated Panel Cost", f"₦{num_panels * panel_info['price']:,.0f}")
         st.metric("Charge Controller Size", f"{controller_current:.0f} A")
-    
+
+        # Installable series x parallel layout for the selected panel, checked against the controllers' windows
+        temperature_limits = (climate_table().temperature_range(project_location)
+                              if project_location in climate_table() else (MIN_TEMP, MAX_CELL_TEMP))
+        layouts = string_layout_table(catalog, required_solar, *temperature_limits)
+        layout = next((l for l in layouts if l["panel"] == panel_type and l["battery_voltage"] == battery_voltage), None)
+        if layout:
+            st.metric("String Layout", f"{layout['series']}S × {layout['parallel']}P ({layout['num_panels']} "
+                      f"{'panel' if layout['num_panels'] == 1 else 'panels'})",
+                      help=f"{layout['array_watts']:,.0f} W array")
+            st.caption(f"{layout['num_controllers']} × {layout['controller']} · string Voc {layout['string_voc_cold']:.0f} V "
+                       f"at {temperature_limits[0]:.0f} °C, Vmp {layout['string_vmp_hot']:.0f} V at "
+                       f"{temperature_limits[1]:.0f} °C cell temperature")
+        else:
+            st.warning(f"No charge controller in the catalog can take {panel_type} strings at {battery_voltage} V.")
+    
+    if layouts:
+        with st.expander("🔌 String layouts for every panel"):
+            st.dataframe(layouts, use_container_width=True, hide_index=True)
+
     # Inverter selection
     st.subheader("Inverter Selection")
-    inverter_size = total_watt * 1.3  # 30% safety margin for Nigerian power conditions
-    selected_inverter = st.selectbox("Choose inverter", list(NIGERIAN_INVERTERS.keys()))
-    inverter_info = NIGERIAN_INVERTERS[selected_inverter]
+    inverter_size = inverter_rating(total_watt)
+    selected_inverter = st.selectbox("Choose inverter", list(catalog.inverters.keys()), key="selected_inverter")
+    inverter_info = catalog.inverters[selected_inverter]
     
     st.metric("Recommended Inverter Size", f"{inverter_size:.0f} W")
     st.metric("Selected Inverter", f"{selected_inverter}")
     st.metric("Inverter Cost", f"₦{inverter_info['price']:,.0f}")
     
     # Total system cost estimation
-    total_cost = (num_batteries * battery_info["price"] + 
-                 num_panels * panel_info["price"] + 
-                 inverter_info["price"])
+    total_cost = system_cost(num_batteries, battery_info["price"],
+                             num_panels, panel_info["price"],
+                             inverter_info["price"])
     
     st.metric("Estimated Total System Cost", f"₦{total_cost:,.0f}")
+    
+    # Catalog-wide search over every panel × battery × inverter × voltage combination
+    if st.checkbox("🔍 Auto-select cheapest system"):
+        front, alternatives = optimize(catalog, total_wh, total_watt, backup_time, dod_limit, temperature_factor,
+                                       sun_hours, system_efficiency)
+        if front:
+            st.caption("Cost vs. battery life cycles: each option below is the cheapest way to reach its cycle rating.")
+            st.dataframe(front, use_container_width=True)
+            st.button("✅ Use cheapest system", on_click=apply_system, args=(front[0],))
+            with st.expander("Cheapest alternatives"):
+                st.dataframe(alternatives, use_container_width=True)
+        else:
+            st.warning(f"No catalog inverter covers the recommended {inverter_size:.0f} W at a matching system voltage.")
+    
+    # Hour-by-hour check of the daily-average design
+    if st.checkbox("📈 Simulate a full year (8760 h)"):
+        reliability_target = st.slider("Reliability target (%)", 90.0, 99.9, 99.0)
+        usable_wh = battery_capacity_ah * battery_voltage * (dod_limit/100) * (temperature_factor/100)
+        year, best, fig_year = year_simulation(st.session_state.load_data, sun_hours, system_efficiency, required_solar,
+                                     usable_wh, num_panels * panel_info["price"], num_batteries * battery_info["price"],
+                                     reliability_target / 100, st.session_state.get("metered_profiles"),
+                                     project_location)
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Unmet Energy", f"{year['unmet_wh'][0] / 1000:,.1f} kWh/yr")
+        col2.metric("Loss-of-Load Probability", f"{year['loss_of_load_probability'][0] * 100:.2f}%")
+        col3.metric("Wasted PV", f"{year['wasted_pv_wh'][0] / 1000:,.1f} kWh/yr")
+        st.plotly_chart(fig_year, use_container_width=True)
+        
+        if best:
+            st.info(f"Minimum size for {reliability_target}% reliability ({best['candidates']} candidates simulated): "
+                    f"{best['pv_watts']:,.0f} W of PV and {best['battery_wh'] / 1000:,.1f} kWh usable storage "
+                    f"(₦{best['cost'] + inverter_info['price']:,.0f}).")
+        else:
+            st.warning(f"No candidate up to 3× the current design reaches {reliability_target}% reliability.")
+
+@rerun_cache.memoize("monte_carlo")
+@metrics.timed("monte_carlo")
+def monte_carlo(total_wh, total_cost, electricity_rate, system_lifespan, sun_hours, battery_cost, life_cycles,
+                tariff_escalation, inflation, sun_hours_sd):
+    mc = simulate_financials(total_wh, total_cost, electricity_rate, system_lifespan, sun_hours,
+                             battery_cost, life_cycles, seed=0,
+                             tariff_escalation=tariff_escalation, inflation=inflation, sun_hours_sd=sun_hours_sd)
+    
+    counts, edges = np.histogram(mc["npv"], bins=60)
+    fig_npv = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, marker_color="#008751"))
+    fig_npv.update_layout(title=f"NPV Distribution ({len(mc['npv']):,} scenarios)",
+                          xaxis_title="NPV (₦)", yaxis_title="Scenarios", bargap=0)
+    
+    years = np.arange(1, system_lifespan + 1)
+    low, mid, high = percentiles(mc["cumulative_cash"], axis=1)
+    fig_fan = go.Figure([
+        go.Scatter(x=years, y=high, line=dict(width=0), showlegend=False),
+        go.Scatter(x=years, y=low, line=dict(width=0), fill="tonexty", fillcolor="rgba(0,135,81,0.2)", name="P10–P90"),
+        go.Scatter(x=years, y=mid, line=dict(color="#006400"), name="P50"),
+    ])
+    fig_fan.update_layout(title="Cumulative Net Cash Position", xaxis_title="Year", yaxis_title="₦")
+    return percentiles(mc["payback_period"]), percentiles(mc["npv"]), fig_npv, fig_fan
+
+section_watch.lap("system_sizing")
 
 # Financial Analysis
 st.markdown(f'<div class="green-header"><h3>💰 Financial Analysis & ROI</h3></div>', unsafe_allow_html=True)
@@ -279,223 +446,169 @@ if st.session_state.load_data:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        current_electricity_rate = st.number_input("Current electricity cost (₦/kWh)", 25, 100, 50)
-        monthly_savings = (total_wh / 1000) * 30 * current_electricity_rate
+        current_electricity_rate = st.number_input("Current electricity cost (₦/kWh)", 25, 100, key="current_electricity_rate")
+    
+    with col2:
+        system_lifespan = st.slider("System lifespan (years)", 5, 25, key="system_lifespan")
+    
+    finance = financials(total_wh, total_cost, current_electricity_rate, system_lifespan)
+    monthly_savings = finance["monthly_savings"]
+    total_savings = finance["total_savings"]
+    payback_period = finance["payback_period"]
+    roi = finance["roi"]
+    
+    with col1:
         st.metric("Estimated Monthly Savings", f"₦{monthly_savings:,.0f}")
     
     with col2:
-        system_lifespan = st.slider("System lifespan (years)", 5, 25, 10)
-        total_savings = monthly_savings * 12 * system_lifespan
         st.metric("Total Lifetime Savings", f"₦{total_savings:,.0f}")
     
     with col3:
-        payback_period = total_cost / (monthly_savings * 12)
-        roi = ((total_savings - total_cost) / total_cost) * 100
         st.metric("Payback Period", f"{payback_period:.1f} years")
         st.metric("ROI", f"{roi:.0f}%")
+    
+    # Monte Carlo risk view over tariff, inflation, sun hours and battery replacement
+    if st.checkbox("🎲 Monte Carlo risk analysis"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            tariff_escalation = st.slider("Tariff escalation (%/year)", 0, 40, 15)
+        with col2:
+            inflation = st.slider("Naira inflation (%/year)", 0, 40, 20)
+        with col3:
+            sun_hours_sd = st.slider("Sun hours uncertainty (± h)", 0.0, 2.0, 0.5)
+        
+        payback_pct, npv_pct, fig_npv, fig_fan = monte_carlo(
+            total_wh, total_cost, current_electricity_rate, system_lifespan, sun_hours,
+            num_batteries * battery_info["price"], battery_info["life_cycles"],
+            tariff_escalation, inflation, sun_hours_sd)
+        
+        col1, col2, col3 = st.columns(3)
+        for col, label, payback, npv in zip((col1, col2, col3), ("P10", "P50", "P90"), payback_pct, npv_pct):
+            with col:
+                st.metric(f"Payback {label}", f"{payback:.1f} years" if np.isfinite(payback) else f"> {system_lifespan} years")
+                st.metric(f"NPV {label}", f"₦{npv:,.0f}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(fig_npv, use_container_width=True)
+        with col2:
+            st.plotly_chart(fig_fan, use_container_width=True)
+    
+    # Two-way sensitivity sweep, every grid point in one batched evaluation
+    if st.checkbox("🌡️ Sensitivity sweep"):
+        sweep_names = list(SWEEP_INPUTS.keys())
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            x_name = st.selectbox("Sweep (x axis)", sweep_names, index=0, format_func=lambda k: SWEEP_INPUTS[k][0])
+        with col2:
+            y_name = st.selectbox("Against (y axis)", [k for k in sweep_names if k != x_name],
+                                  format_func=lambda k: SWEEP_INPUTS[k][0])
+        with col3:
+            resolution = st.slider("Grid resolution", 20, 200, 200, step=20)
+        
+        grid = sweep(dict(total_wh=total_wh, total_watt=total_watt, backup_time=backup_time,
+                          battery_voltage=battery_voltage, dod_limit=dod_limit, temperature_factor=temperature_factor,
+                          sun_hours=sun_hours, system_efficiency=system_efficiency,
+                          battery_capacity=battery_info["capacity"], battery_price=battery_info["price"],
+                          panel_vmp=panel_info["vmp"], panel_price=panel_info["price"],
+                          inverter_price=inverter_info["price"], current_electricity_rate=current_electricity_rate,
+                          system_lifespan=system_lifespan),
+                     x_name, y_name, resolution)
+        
+        for tab, (name, title) in zip(st.tabs(["Total cost", "Payback period", "Number of panels"]),
+                                      [("total_cost", "Total System Cost (₦)"), ("payback_period", "Payback Period (years)"),
+                                       ("num_panels", "Number of Panels")]):
+            with tab:
+                fig_heat = go.Figure(go.Heatmap(x=grid["x"], y=grid["y"], z=grid[name], colorscale="Greens",
+                                                colorbar=dict(title=title)))
+                fig_heat.update_layout(title=title, xaxis_title=SWEEP_INPUTS[x_name][0],
+                                       yaxis_title=SWEEP_INPUTS[y_name][0])
+                st.plotly_chart(fig_heat, use_container_width=True)
+
+section_watch.lap("financial_analysis")
 
 # Enhanced PDF Generation with Nigerian branding
+def current_quote():
+    return {
+        "client_name": client_name,
+        "client_address": client_address,
+        "client_phone": client_phone,
+        "client_email": client_email,
+        "project_location": project_location,
+        "load_data": st.session_state.load_data.records(),
+        "total_watt": total_watt,
+        "total_wh": total_wh,
+        "backup_time": backup_time,
+        "battery_voltage": battery_voltage,
+        "dod_limit": dod_limit,
+        "temperature_factor": temperature_factor,
+        "sun_hours": sun_hours,
+        "system_efficiency": system_efficiency,
+        "current_electricity_rate": current_electricity_rate,
+        "battery_type": battery_type,
+        "battery_info": battery_info,
+        "battery_capacity_ah": battery_capacity_ah,
+        "num_batteries": num_batteries,
+        "panel_type": panel_type,
+        "panel_info": panel_info,
+        "required_solar": required_solar,
+        "num_panels": num_panels,
+        "controller_current": controller_current,
+        "selected_inverter": selected_inverter,
+        "inverter_info": inverter_info,
+        "inverter_size": inverter_size,
+        "total_cost": total_cost,
+        "monthly_savings": monthly_savings,
+        "total_savings": total_savings,
+        "payback_period": payback_period,
+        "roi": roi,
+        "system_lifespan": system_lifespan,
+    }
+
 def create_professional_pdf():
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Create custom styles
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#006400'),
-        spaceAfter=30,
-        alignment=1
-    )
-    
-    heading_style = ParagraphStyle(
-        'Heading',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.HexColor('#006400'),
-        spaceAfter=12
-    )
-    
-    normal_style = ParagraphStyle(
-        'Normal',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=6
-    )
-    
-    story = []
-    
-    # Header with Nigerian colors
-    story.append(Paragraph(COMPANY, title_style))
-    story.append(Paragraph(MOTTO, styles['Heading2']))
-    story.append(Spacer(1, 20))
-    
-    # Client Information
-    story.append(Paragraph("CLIENT INFORMATION", heading_style))
-    client_data = [
-        ["Name:", client_name],
-        ["Address:", client_address],
-        ["Phone:", client_phone],
-        ["Email:", client_email if client_email else "Not provided"],
-        ["Location:", project_location],
-        ["Date:", datetime.datetime.now().strftime("%Y-%m-%d %H:%M")],
-        ["Quote Reference:", f"ANNUR-{datetime.datetime.now().strftime('%Y%m%d')}-001"]
-    ]
-    
-    client_table = Table(client_data, colWidths=[80, 400])
-    client_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-    ]))
-    story.append(client_table)
-    story.append(Spacer(1, 20))
-    
-    # Load Audit
-    story.append(Paragraph("LOAD AUDIT SUMMARY", heading_style))
-    load_data = [["Appliance", "Wattage (W)", "Qty", "Total Watt", "Hours/Day", "Wh/Day"]]
-    
-    for item in st.session_state.load_data:
-        load_data.append([
-            item['appliance'],
-            str(item['watt']),
-            str(item['quantity']),
-            str(item['total_watt']),
-            str(item['hours']),
-            f"{item['wh']:,.1f}"
-        ])
-    
-    load_data.append([
-        "TOTAL", "", "", f"{total_watt:,}", "", f"{total_wh:,.1f}"
-    ])
-    
-    load_table = Table(load_data, colWidths=[120, 60, 40, 60, 60, 60])
-    load_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFD700')),
-        ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
-    ]))
-    story.append(load_table)
-    story.append(Spacer(1, 20))
-    
-    # System Sizing
-    story.append(Paragraph("SYSTEM SIZING & COMPONENTS", heading_style))
-    sizing_data = [
-        ["Parameter", "Value", "Unit", "Details"],
-        ["Total Energy Demand", f"{total_wh:,.0f}", "Wh/day", "Daily consumption"],
-        ["Backup Time", f"{backup_time}", "hours", "Required autonomy"],
-        ["Battery Capacity", f"{battery_capacity_ah:,.0f}", "Ah", f"At {battery_voltage}V, {dod_limit}% DoD"],
-        ["Battery System", f"{num_batteries:.1f}", "units", f"{battery_type}"],
-        ["Solar Capacity", f"{required_solar:,.0f}", "W", "Required array size"],
-        ["Solar Panels", f"{num_panels:.1f}", "units", f"{panel_type}"],
-        ["Charge Controller", f"{controller_current:.0f}", "A", f"At {battery_voltage}V"],
-        ["Inverter Size", f"{inverter_size:.0f}", "W", f"{selected_inverter}"],
-        ["System Voltage", f"{battery_voltage}", "V", "DC system voltage"]
-    ]
-    
-    sizing_table = Table(sizing_data, colWidths=[120, 80, 40, 180])
-    sizing_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-    ]))
-    story.append(sizing_table)
-    story.append(Spacer(1, 20))
-    
-    # Financial Analysis
-    story.append(Paragraph("FINANCIAL ANALYSIS", heading_style))
-    financial_data = [
-        ["Component", "Quantity", "Unit Price (₦)", "Total Cost (₦)"],
-        [battery_type, f"{num_batteries:.1f}", f"{battery_info['price']:,.0f}", f"{num_batteries * battery_info['price']:,.0f}"],
-        [panel_type, f"{num_panels:.1f}", f"{panel_info['price']:,.0f}", f"{num_panels * panel_info['price']:,.0f}"],
-        [selected_inverter, "1", f"{inverter_info['price']:,.0f}", f"{inverter_info['price']:,.0f}"],
-        ["Installation & Misc", "1", "Est. 150,000", "150,000"],
-        ["TOTAL SYSTEM COST", "", "", f"₦{total_cost + 150000:,.0f}"]
-    ]
-    
-    financial_table = Table(financial_data, colWidths=[150, 50, 80, 100])
-    financial_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006400')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#FFD700')),
-        ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
-    ]))
-    story.append(financial_table)
-    story.append(Spacer(1, 20))
-    
-    # ROI Analysis
-    roi_data = [
-        ["Monthly Savings", f"₦{monthly_savings:,.0f}"],
-        ["Annual Savings", f"₦{monthly_savings * 12:,.0f}"],
-        ["Payback Period", f"{payback_period:.1f} years"],
-        ["ROI over {system_lifespan} years", f"{roi:.0f}%"],
-        ["Lifetime Savings", f"₦{total_savings:,.0f}"]
-    ]
-    
-    roi_table = Table(roi_data, colWidths=[150, 100])
-    roi_table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    story.append(roi_table)
-    story.append(Spacer(1, 30))
-    
-    # Terms and Conditions
-    story.append(Paragraph("TERMS & CONDITIONS", heading_style))
-    terms_text = """
-    <b>Quote Validity:</b> 30 days from date of issue<br/>
-    <b>Warranty:</b> Equipment as per manufacturer warranty + 1 year workmanship<br/>
-    <b>Payment Terms:</b> 50% advance, 50% upon completion<br/>
-    <b>Installation Timeline:</b> 5-7 working days after material availability<br/>
-    <b>Service:</b> 6 months free maintenance included<br/>
-    """
-    story.append(Paragraph(terms_text, normal_style))
-    story.append(Spacer(1, 20))
-    
-    # Footer
-    footer_text = f"""
-    {COMPANY} | {MOTTO} | {PHONE} | {EMAIL} | {WEBSITE}<br/>
-    {ADDRESS}<br/>
-    {BUSINESS_NUMBER} | {CAC_REGISTRATION}<br/>
-    <i>Thank you for choosing Annur Tech - Powering Nigeria's Future</i>
-    """
-    story.append(Paragraph(footer_text, normal_style))
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return build_quotation_pdf(current_quote())
+
+# Poll a background render without rerunning the whole script; rerun it once the job settles or `deadline` passes
+@st.fragment(run_every=1)
+def pdf_job_progress(job_id, deadline=None):
+    status = pdf_queue.status(job_id)
+    if status["state"] not in ("queued", "running") or (deadline and time.time() > deadline):
+        st.rerun()
+    label = (f"Queued for rendering (position {status['position']})..." if status["state"] == "queued"
+             else "Generating professional quotation...")
+    st.progress(status["progress"], text=label)
 
 # PDF Export Section
 if st.button("📄 Generate Professional Quotation PDF"):
     if not client_name or not st.session_state.load_data:
         st.warning("Please fill in client information and add at least one appliance first.")
     else:
-        with st.spinner("Generating professional quotation..."):
-            pdf = create_professional_pdf()
-            st.success("Professional quotation generated successfully!")
-            
-            # Create download button
-            st.download_button(
-                "📥 Download Professional Quotation", 
-                data=pdf, 
-                file_name=f"AnnurTech_Quotation_{client_name.replace(' ', '_')}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf", 
-                mime="application/pdf"
-            )
+        try:
+            st.session_state.pdf_job = pdf_queue.submit(current_quote(), profile=metrics.enabled)
+        except QueueFull:
+            st.warning("The quotation service is busy. Please try again in a moment.")
+
+# Only offer the document while it still matches the inputs on screen
+if st.session_state.get("pdf_job") and st.session_state.load_data and \
+        st.session_state.pdf_job == quote_key(current_quote()):
+    pdf_job = st.session_state.pdf_job
+    status = pdf_queue.status(pdf_job)
+    if status["state"] in ("queued", "running"):
+        pdf_job_progress(pdf_job)
+    elif status["state"] == "failed":
+        st.error(f"Quotation could not be generated: {status['error']}")
+    elif status["state"] == "done":
+        st.success("Professional quotation generated successfully!")
+        
+        # Create download button
+        st.download_button(
+            "📥 Download Professional Quotation", 
+            data=pdf_queue.result(pdf_job), 
+            file_name=f"AnnurTech_Quotation_{client_name.replace(' ', '_')}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf", 
+            mime="application/pdf"
+        )
+
+section_watch.lap("pdf_export")
 
 # Additional Features
 st.markdown(f'<div class="green-header"><h3>📋 Additional Features</h3></div>', unsafe_allow_html=True)
@@ -504,18 +617,176 @@ col1, col2, col3 = st.columns(3)
 
 with col1:
     if st.button("💾 Save Configuration"):
-        # Save configuration to session state
-        st.success("Configuration saved!")
+        if not client_name or not st.session_state.load_data:
+            st.warning("Please fill in client information and add at least one appliance first.")
+        else:
+            quote = current_quote()
+            bom = bill_of_materials(quote)
+            quote_id = open_store().save({field: quote[field] for field in CLIENT_FIELDS}, quote["load_data"],
+                                         {setting: quote[setting] for setting in DEFAULT_SETTINGS}, bom,
+                                         sum(line["quantity"] * line["unit_price"] for line in bom))
+            st.success(f"Configuration saved! (Quote #{quote_id})")
         
 with col2:
+    # The PDF is rendered by the PDF workers; once it is ready the email joins the outbox and is sent in the background
     if st.button("📧 Email Quote"):
-        st.info("Email feature would be integrated with your email service")
+        if not client_email or not st.session_state.load_data:
+            st.warning("Please enter the client's email address and add at least one appliance first.")
+        elif not open_mailer().configured:
+            st.info("Email delivery is not set up on this server (SOLAR_SMTP_HOST).")
+        else:
+            quote = current_quote()
+            try:
+                email_job = pdf_queue.submit(quote, profile=metrics.enabled)
+            except QueueFull:
+                st.warning("The quotation service is busy. Please try again in a moment.")
+            else:
+                filename = (f"AnnurTech_Quotation_{client_name.replace(' ', '_') or 'client'}_"
+                            f"{datetime.datetime.now().strftime('%Y%m%d')}.pdf")
+                st.session_state.email_request = {
+                    "job": email_job, "recipient": client_email, "message": quote_email(quote),
+                    "filename": filename, "deadline": time.time() + EMAIL_PDF_TIMEOUT}
+                st.session_state.email_id = None
+    email_request = st.session_state.get("email_request")
+    if email_request:
+        status = pdf_queue.status(email_request["job"])
+        pdf = pdf_queue.result(email_request["job"]) if status["state"] == "done" else None
+        if pdf is not None:
+            st.session_state.email_id = open_mailer().send(email_request["recipient"], *email_request["message"], pdf,
+                                                           email_request["filename"])
+            del st.session_state.email_request
+        elif status["state"] == "failed":
+            st.error(f"Quotation could not be generated for the email: {status['error']}")
+            del st.session_state.email_request
+        elif status["state"] not in ("queued", "running"):
+            st.error("The quotation for the email is no longer available. Please try again.")
+            del st.session_state.email_request
+        elif time.time() > email_request["deadline"]:
+            st.error("Preparing the quotation for the email timed out. Please try again.")
+            del st.session_state.email_request
+        else:
+            pdf_job_progress(email_request["job"], email_request["deadline"])
+    if st.session_state.get("email_id"):
+        email_status = open_mailer().outbox.status(st.session_state.email_id)
+        st.caption(f"📧 Quote to {email_status['recipient']}: {email_status['status']}"
+                   + (f" (attempt {email_status['attempts']}, will retry)" if email_status["status"] == "pending"
+                      and email_status["attempts"] else ""))
 
 with col3:
     if st.button("🔄 New Calculation"):
-        st.session_state.load_data = []
+        st.session_state.load_data.clear()
         st.rerun()
 
+section_watch.lap("additional_features")
+
+# Restore a saved quote into the widgets (runs before the next rerun)
+def open_saved_quote(quote_id):
+    saved = open_store().get(quote_id)
+    choices = {"project_location": PROJECT_LOCATIONS, "battery_voltage": SYSTEM_VOLTAGES,
+               "battery_type": catalog.batteries, "panel_type": catalog.panels,
+               "selected_inverter": catalog.inverters}
+    values = {field: saved[field] for field in CLIENT_FIELDS}
+    values.update((setting, saved["settings"][setting]) for setting in DEFAULT_SETTINGS if setting in saved["settings"])
+    for key, value in values.items():
+        # Skip components that have since left the catalog
+        if key not in choices or value in choices[key]:
+            st.session_state[key] = value
+    st.session_state.load_data = LoadStore(saved["loads"])
+
+saved_quotes_panel = st.expander("📂 Saved Quotes", key="saved_quotes_panel", on_change="rerun")
+with saved_quotes_panel:
+    if saved_quotes_panel.open:
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            quote_search = st.text_input("Search by client name or phone")
+        with col2:
+            quote_location = st.selectbox("Location", ["All"] + PROJECT_LOCATIONS)
+        with col3:
+            quote_page = st.number_input("Page", 1, None, 1)
+    
+        saved_quotes, saved_total = open_store().search(quote_search, None if quote_location == "All" else quote_location,
+                                                        page=quote_page)
+        if saved_quotes:
+            st.caption(f"{saved_total:,} matching quotes")
+            st.dataframe(saved_quotes, use_container_width=True, hide_index=True)
+            quote_to_open = st.selectbox("Quote to open", [q["id"] for q in saved_quotes],
+                                         format_func=lambda i: next(f"#{q['id']} — {q['client_name']} ({q['created_at'][:10]})"
+                                                                    for q in saved_quotes if q["id"] == i))
+            st.button("📂 Open Quote", on_click=open_saved_quote, args=(quote_to_open,))
+        else:
+            st.caption("No saved quotes match.")
+
+section_watch.lap("saved_quotes")
+
+portfolio_panel = st.expander("🏘️ Portfolio Mode", key="portfolio_panel", on_change="rerun")
+with portfolio_panel:
+    if portfolio_panel.open:
+        import pandas as pd
+
+        st.caption("Size many sites at once, e.g. every unit on an estate. Upload the bulk quotation format: "
+                   "one row per load item with client_name (or quote_id) grouping a site's rows, plus optional "
+                   "project_location and settings columns.")
+        portfolio_file = st.file_uploader("Sites CSV or JSON", type=["csv", "json"], key="portfolio_file")
+        if portfolio_file is not None and st.button("🏘️ Size Portfolio"):
+            try:
+                st.session_state.portfolio = size_portfolio(read_jobs(portfolio_file.name, portfolio_file))
+            except (KeyError, ValueError) as e:
+                st.error(f"Could not read {portfolio_file.name}: {e!r}")
+        if "portfolio" in st.session_state:
+            sites, portfolio_bom, portfolio_summary = st.session_state.portfolio
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Sites Sized", f"{portfolio_summary['sites'] - portfolio_summary['failed']:,}",
+                        help=f"{portfolio_summary['failed']} failed" if portfolio_summary["failed"] else None)
+            col2.metric("Portfolio Cost", f"₦{portfolio_summary['total_cost'] + portfolio_summary['installation_cost']:,.0f}",
+                        help=f"Equipment ₦{portfolio_summary['total_cost']:,.0f} plus installation")
+            col3.metric("Payback Period", f"{portfolio_summary['payback_period']:.1f} years")
+            col4.metric("ROI", f"{portfolio_summary['roi']:.0f}%")
+            st.subheader("Combined Bill of Materials")
+            bom_frame = pd.DataFrame(portfolio_bom)
+            st.dataframe(bom_frame, use_container_width=True, hide_index=True)
+            st.download_button("📥 Download Bill of Materials (CSV)", bom_frame.to_csv(index=False),
+                               file_name=f"AnnurTech_Portfolio_BOM_{datetime.datetime.now().strftime('%Y%m%d')}.csv",
+                               mime="text/csv")
+            st.subheader("Sites")
+            st.dataframe(pd.DataFrame(sites, columns=SITE_FIELDS), use_container_width=True, hide_index=True)
+
+section_watch.lap("portfolio")
+
+catalog_panel = st.expander("🗂️ Component Catalog", key="catalog_panel", on_change="rerun")
+with catalog_panel:
+    if catalog_panel.open:
+        import pandas as pd
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            catalog_category = st.selectbox("Category", ["panel", "battery", "inverter", "controller"],
+                                            format_func=lambda c: f"{c.title()}s")
+        components = catalog.components[catalog_category]
+        with col2:
+            prices = [spec["price"] for spec in components.values()]
+            price_band = st.slider("Price band (₦)", min(prices), max(prices), (min(prices), max(prices)))
+        with col3:
+            voltages = sorted({spec["voltage"] for spec in components.values() if "voltage" in spec})
+            catalog_voltage = st.selectbox("Voltage", ["Any"] + voltages) if voltages else "Any"
+        criteria = {"price": price_band}
+        if catalog_voltage != "Any":
+            criteria["voltage"] = catalog_voltage
+        matches = catalog.find(catalog_category, **criteria)
+        st.caption(f"{len(matches)} of {len(components)} components · catalog version {catalog.version}")
+        st.dataframe(pd.DataFrame.from_dict(matches, orient="index"), use_container_width=True)
+
+section_watch.lap("component_catalog")
+
+cache_panel = st.expander("⚙️ Cache statistics", key="cache_panel", on_change="rerun")
+with cache_panel:
+    if cache_panel.open:
+        import pandas as pd
+
+        st.dataframe(pd.DataFrame(rerun_cache.stats(), columns=["section", "hits", "misses", "hit_rate"]),
+                     use_container_width=True)
+
+section_watch.lap("cache_statistics")
+
 # Footer
 st.markdown("---")
 st.markdown(f"""
@@ -526,3 +797,23 @@ st.markdown(f"""
     © {datetime.datetime.now().year} Annur Tech Solar Solutions - Powering Nigeria's Future
 </div>
 """, unsafe_allow_html=True)
+section_watch.lap("footer")
+rerun_watch.lap("rerun")
+
+# Admin performance page: p50/p95 per section over the most recent timings in this server process
+if show_performance:
+    st.markdown('<div class="green-header"><h3>⏱️ Performance</h3></div>', unsafe_allow_html=True)
+    performance = metrics.stats()
+    if performance:
+        st.dataframe(performance, use_container_width=True, hide_index=True)
+        metrics_file = io.StringIO()
+        metrics.export(metrics_file)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📥 Download Metrics (CSV)", metrics_file.getvalue(),
+                               file_name=f"AnnurTech_Metrics_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                               mime="text/csv")
+        with col2:
+            st.button("🧹 Clear Metrics", on_click=metrics.clear)
+    else:
+        st.caption("No timings recorded yet; they appear after the next rerun.")
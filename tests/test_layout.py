@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from catalog import SYSTEM_VOLTAGES, current_catalog
+from layout import (CHARGE_RATIO, ISC_RATIO, MAX_SERIES, START_MARGIN, VMP_TEMP_COEFF, VOC_TEMP_COEFF,
+                    string_layouts)
+from sizing import CONTROLLER_MARGIN
+
+# string_layouts() against a plain loop over every panel, system voltage,
+# controller, series count, parallel count and controller count, checking each
+# constraint directly.
+
+
+def brute_force(required_solar, panels, controllers, voltages=SYSTEM_VOLTAGES, min_temp=10.0, max_cell_temp=65.0):
+    """Cheapest cost per (panel, battery voltage)."""
+    best = {}
+    for panel_name, panel in panels.items():
+        isc = panel.get("isc", panel["power"] / panel["vmp"] * ISC_RATIO)
+        voc_cold = panel["voc"] * (1 + VOC_TEMP_COEFF * (25.0 - min_temp))
+        vmp_hot = panel["vmp"] * (1 - VMP_TEMP_COEFF * (max_cell_temp - 25.0))
+        for volts in voltages:
+            for controller in controllers.values():
+                if controller["voltage"] < volts:
+                    continue
+                for series in range(1, MAX_SERIES + 1):
+                    if (series * voc_cold > controller["max_voc"] or series * panel["vmp"] > controller["mppt_max"]
+                            or series * vmp_hot < max(controller.get("mppt_min", 0.0),
+                                                      volts * CHARGE_RATIO + START_MARGIN)):
+                        continue
+                    fewest = math.ceil(required_solar / (series * panel["power"]))
+                    for parallel in range(1, max(fewest, 1) + 3):
+                        if series * parallel * panel["power"] < required_solar:
+                            continue
+                        for count in range(1, parallel + 1):
+                            strings = math.ceil(parallel / count)  # on the busiest controller
+                            if (strings * isc > controller.get("max_pv_current", math.inf)
+                                    or strings * series * panel["power"] * CONTROLLER_MARGIN
+                                    > controller["current"] * volts):
+                                continue
+                            cost = series * parallel * panel["price"] + count * controller["price"]
+                            best[panel_name, volts] = min(best.get((panel_name, volts), math.inf), cost)
+    return best
+
+
+def random_components(seed):
+    rng = np.random.default_rng(seed)
+    panels = {}
+    for i in range(5):
+        vmp = float(rng.uniform(17, 45))
+        panel = {"price": int(rng.integers(30_000, 200_000)), "power": int(rng.integers(100, 600)), "vmp": vmp,
+                 "voc": vmp * float(rng.uniform(1.15, 1.3))}
+        if rng.random() < 0.5:
+            panel["isc"] = panel["power"] / vmp * float(rng.uniform(1.02, 1.1))
+        panels[f"Panel {i}"] = panel
+    controllers = {}
+    for i in range(4):
+        max_voc = float(rng.uniform(100, 250))
+        controller = {"price": int(rng.integers(50_000, 400_000)), "voltage": int(rng.choice(SYSTEM_VOLTAGES)),
+                      "max_voc": max_voc, "mppt_max": max_voc * 0.75, "current": int(rng.integers(20, 100))}
+        if rng.random() < 0.5:
+            controller["mppt_min"] = float(rng.uniform(10, 60))
+        if rng.random() < 0.5:
+            controller["max_pv_current"] = float(rng.uniform(10, 40))
+        controllers[f"Controller {i}"] = controller
+    return panels, controllers
+
+
+def check(required_solar, panels, controllers, **kwargs):
+    layouts = string_layouts(required_solar, panels, controllers, **kwargs)
+    found = {(layout["panel"], layout["battery_voltage"]): layout["cost"] for layout in layouts}
+    expected = brute_force(required_solar, panels, controllers, **kwargs)
+    assert found.keys() == expected.keys()
+    for key, cost in expected.items():
+        assert found[key] == pytest.approx(cost)
+    for layout in layouts:
+        assert layout["num_panels"] == layout["series"] * layout["parallel"]
+        assert layout["array_watts"] >= required_solar
+
+
+@pytest.mark.parametrize("required_solar", [150, 1200, 4800, 15000])
+def test_catalog_layouts_match_brute_force(required_solar):
+    catalog = current_catalog()
+    check(required_solar, catalog.panels, catalog.controllers)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("required_solar", [300, 3000, 12000])
+def test_random_layouts_match_brute_force(seed, required_solar):
+    panels, controllers = random_components(seed)
+    check(required_solar, panels, controllers, min_temp=float(seed), max_cell_temp=60.0 + seed)
+
+
+def test_no_controllers_means_no_layouts():
+    assert string_layouts(1000, current_catalog().panels, {}) == []
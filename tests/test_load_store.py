@@ -0,0 +1,49 @@
+import pytest
+
+from load_store import INITIAL_CAPACITY, LoadStore
+
+# The running totals must always match a fresh sum over the rows, whichever
+# way (including negative indices) rows are added, edited and deleted.
+
+
+def assert_totals(store):
+    rows = store.records()
+    assert store.total_watt == pytest.approx(sum(row["watt"] * row["quantity"] for row in rows))
+    assert store.total_wh == pytest.approx(sum(row["watt"] * row["quantity"] * row["hours"] for row in rows))
+    for row in rows:
+        assert row["total_watt"] == row["watt"] * row["quantity"]
+        assert row["wh"] == row["total_watt"] * row["hours"]
+
+
+def test_totals_follow_add_update_and_delete():
+    store = LoadStore()
+    for i in range(INITIAL_CAPACITY + 4):  # past the first reallocation
+        store.add(f"Appliance {i % 5}", 10.0 * (i + 1), i % 3 + 1, 0.5 * (i % 8) + 1)
+    assert_totals(store)
+
+    store.update(-1, watt=1500.0)
+    assert store[-1]["watt"] == 1500.0
+    assert_totals(store)
+    store.update(-len(store), quantity=4, hours=12.0)
+    assert (store[0]["quantity"], store[0]["hours"]) == (4, 12.0)
+    assert_totals(store)
+    store.update(3, appliance="Freezer")
+    assert store[3]["appliance"] == "Freezer"
+    assert_totals(store)
+
+    last, first = store[-1], store[1]
+    store.delete(-1, 0, -len(store))  # 0 and -len(store) are the same row
+    assert len(store) == INITIAL_CAPACITY + 2
+    assert store[0] == first and store[-1] != last
+    assert_totals(store)
+
+    store.delete(*range(len(store)))
+    assert (len(store), store.total_watt, store.total_wh) == (0, 0, 0.0)
+
+
+def test_out_of_range_update_is_rejected():
+    store = LoadStore([{"appliance": "Fan", "watt": 75.0, "quantity": 2, "hours": 8.0}])
+    for index in (1, -2):
+        with pytest.raises(IndexError):
+            store.update(index, watt=10.0)
+    assert_totals(store)
@@ -0,0 +1,211 @@
+import email
+import email.policy
+import io
+import socketserver
+import threading
+import time
+
+import pytest
+
+import mailer
+from mailer import Mailer, Outbox, send_repriced
+from quotation import default_settings, load_item
+from quote_store import QuoteStore
+
+# Outbox delivery, retries and permanent failures against a minimal in-process
+# SMTP server. Replies to DATA can be scripted per recipient (e.g. one "451"
+# before accepting), and recipients in `refused` are rejected at RCPT.
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def _data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if line in (b".\r\n", b""):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self._reply("220 standin ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 standin")
+            elif verb == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipient = command.split(":", 1)[1].strip().strip("<>")
+                if recipient in server.refused:
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(recipient)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._data()
+                with server.lock:
+                    scripted = server.replies.get(recipients[0])
+                    reply = scripted.pop(0) if scripted else None
+                    if reply is None:
+                        server.messages.append(email.message_from_bytes(data, policy=email.policy.default))
+                self._reply(reply or "250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:  # RSET, NOOP
+                recipients = []
+                self._reply("250 OK")
+
+
+class SMTPStandin(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.refused = set()
+        self.replies = {}  # recipient -> replies to DATA before the message is accepted
+
+
+@pytest.fixture
+def smtp():
+    server = SMTPStandin()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(str(tmp_path / "quotes.db"))
+
+
+@pytest.fixture
+def make_mailer(outbox):
+    mailers = []
+
+    def make(port):
+        m = Mailer(outbox, host="127.0.0.1", port=port, user="", password="", tls="", sender="quotes@example.ng")
+        mailers.append(m)
+        return m
+
+    yield make
+    for m in mailers:
+        m.stop(5)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_delivers_with_attachments_over_reused_connections(smtp, make_mailer):
+    m = make_mailer(smtp.server_address[1])
+    m.send_many([(f"client{i}@example.ng", "Quote", "Hello", "quote.pdf", b"%PDF-1.4 test") for i in range(50)])
+    wait_for(lambda: m.outbox.counts() == {"sent": 50})
+    assert len(smtp.messages) == 50
+    assert smtp.connections <= m.senders
+    message = smtp.messages[0]
+    assert message["Subject"] == "Quote"
+    assert [part.get_filename() for part in message.iter_attachments()] == ["quote.pdf"]
+
+
+def test_temporary_failure_is_retried(smtp, make_mailer, monkeypatch):
+    monkeypatch.setattr(mailer, "BACKOFF", 0.1)
+    smtp.replies["retry@example.ng"] = ["451 Try again later", "451 Try again later"]
+    m = make_mailer(smtp.server_address[1])
+    message_id = m.send("retry@example.ng", "Quote", "Hello")
+    wait_for(lambda: m.outbox.status(message_id)["status"] == "sent")
+    assert m.outbox.status(message_id)["attempts"] == 3
+    assert [msg["To"] for msg in smtp.messages] == ["retry@example.ng"]
+
+
+@pytest.mark.parametrize("setup", ["data", "recipient"])
+def test_permanent_rejection_fails_at_once(smtp, make_mailer, setup):
+    if setup == "data":
+        smtp.replies["bounce@example.ng"] = ["554 Message rejected"]
+    else:
+        smtp.refused.add("bounce@example.ng")
+    m = make_mailer(smtp.server_address[1])
+    bounce = m.send("bounce@example.ng", "Quote", "Hello")
+    ok = m.send("ok@example.ng", "Quote", "Hello")
+    wait_for(lambda: m.outbox.status(bounce)["status"] == "failed" and m.outbox.status(ok)["status"] == "sent")
+    assert m.outbox.status(bounce)["attempts"] == 1
+    assert m.outbox.status(bounce)["last_error"]
+
+
+def test_unreachable_server_schedules_a_retry(smtp, make_mailer):
+    port = smtp.server_address[1]
+    smtp.shutdown()
+    smtp.server_close()
+    m = make_mailer(port)
+    message_id = m.send("client@example.ng", "Quote", "Hello")
+    wait_for(lambda: m.outbox.status(message_id)["attempts"] == 1)
+    assert m.outbox.status(message_id)["status"] == "pending"
+    assert not m.busy()  # the retry is due later
+
+
+def test_backoff_doubles_until_max_attempts(outbox, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(mailer.time, "time", lambda: now)
+    (message_id,) = outbox.add([("client@example.ng", "Quote", "Hello", None, None)])
+    for attempt in range(1, mailer.MAX_ATTEMPTS):
+        assert [row["id"] for row in outbox.claim()] == [message_id]
+        outbox.failed(message_id, "451")
+        delay = outbox._connect().execute("SELECT next_attempt FROM outbox").fetchone()[0] - now
+        assert delay == pytest.approx(mailer.BACKOFF * 2 ** (attempt - 1))
+        assert outbox.claim() == []  # not due yet
+        now += delay
+    outbox.claim()
+    outbox.failed(message_id, "451")
+    assert outbox.status(message_id)["status"] == "failed"
+    assert outbox.status(message_id)["attempts"] == mailer.MAX_ATTEMPTS
+
+
+def test_stale_claim_is_sent_again(outbox, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(mailer.time, "time", lambda: now)
+    (message_id,) = outbox.add([("client@example.ng", "Quote", "Hello", None, None)])
+    assert len(outbox.claim()) == 1
+    assert outbox.claim() == []  # claimed by a sender that is still working on it
+    now += mailer.STALE_SENDING + 1
+    assert [row["id"] for row in outbox.claim()] == [message_id]
+    assert outbox.status(message_id)["status"] == "sending"
+
+
+def test_send_repriced_skips_quotes_that_fail_to_render_and_leaves_the_store(smtp, make_mailer, tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.db"))
+    settings, quote_ids = default_settings(), []
+    for i, battery in enumerate([settings["battery_type"], "Discontinued Battery"]):
+        client = {"client_name": f"Client {i}", "client_address": "", "client_phone": "",
+                  "client_email": f"client{i}@example.ng", "project_location": "Lagos"}
+        quote_ids.append(store.save(client, [load_item("Laptop", 60, 1, 5)], dict(settings, battery_type=battery),
+                                    [{"component": battery, "quantity": 1.0, "unit_price": 100}], 100))
+    m = make_mailer(smtp.server_address[1])
+    log = io.StringIO()
+    queued, failed = send_repriced(m, store, workers=1, log=log)
+    assert (queued, failed) == (1, 1)
+    assert "Discontinued Battery" in log.getvalue()
+    wait_for(lambda: m.outbox.counts() == {"sent": 1})
+    assert smtp.messages[0]["To"] == "client0@example.ng"
+    saved = [store.get(quote_id) for quote_id in quote_ids]
+    assert [(q["bom"][0]["unit_price"], q["total_cost"]) for q in saved] == [(100, 100), (100, 100)]
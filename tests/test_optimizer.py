@@ -0,0 +1,26 @@
+import pytest
+
+from optimizer import cheapest_systems, pareto_front
+from sizing import battery_bank
+
+# Battery banks are strings of batteries in series: the optimizer must count
+# (and cost) every battery in them, and skip batteries that can't make the voltage.
+
+PANELS = {"Panel": {"price": 100000, "vmp": 30.0}}
+INVERTERS = {"Inverter": {"price": 300000, "power": 5000, "voltage": 24}}
+BATTERIES = {
+    "6V": {"price": 65000, "capacity": 225, "voltage": 6, "life_cycles": 1500},
+    "48V": {"price": 900000, "capacity": 200, "voltage": 48, "life_cycles": 6000},
+}
+SIZING = (3000, 1000, 5, 80, 90, 5.0, 75)  # total_wh, total_watt, backup_time, dod, temperature, sun_hours, efficiency
+
+
+def test_series_batteries_are_counted_and_costed():
+    systems = cheapest_systems(*SIZING, panels=PANELS, batteries=BATTERIES, inverters=INVERTERS, voltages=(24,))
+    assert [s["battery"] for s in systems] == ["6V"]  # a 48 V battery can't make a 24 V bank
+    _, strings = battery_bank(3000, 5, 24, 80, 90, 225)
+    (system,) = systems
+    assert system["num_batteries"] == pytest.approx(strings * 4)
+    panel_cost = system["num_panels"] * PANELS["Panel"]["price"]
+    assert system["total_cost"] == pytest.approx(strings * 4 * 65000 + panel_cost + 300000)
+    assert pareto_front(*SIZING, panels=PANELS, batteries=BATTERIES, inverters=INVERTERS, voltages=(24,)) == systems
@@ -0,0 +1,30 @@
+import functools
+import os
+
+import catalog
+import quotation
+from quotation import load_item, prepare_quote
+
+# Quotes against a hot-reloaded copy of the catalog: a reload that drops the
+# default components must not leave prepare_quote() pointing at them.
+
+CLIENT = {"client_name": "Client", "project_location": "Lagos"}
+
+
+def test_reload_that_removes_the_default_battery(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.csv"
+    path.write_text(open(catalog.CATALOG_PATH, encoding="utf-8").read(), encoding="utf-8")
+    monkeypatch.setattr(catalog, "RELOAD_INTERVAL", 0)
+    monkeypatch.setattr(quotation, "current_catalog", functools.partial(catalog.current_catalog, str(path)))
+    loads = [load_item("Laptop", 60, 1, 5)]
+
+    first = prepare_quote(CLIENT, loads)["battery_type"]
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    path.write_text("".join(line for line in lines if f",{first}," not in line), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    quote = prepare_quote(CLIENT, loads)
+    assert quote["battery_type"] != first
+    assert quote["battery_type"] == next(iter(quotation.current_catalog().batteries))
+    assert quote["num_batteries"] > 0
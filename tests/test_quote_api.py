@@ -0,0 +1,85 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from quote_api import QuoteServer
+
+# Request validation in the quote API, against a server on a free local port.
+
+LOAD = {"appliance": "Laptop", "watt": 60, "quantity": 1, "hours": 5}
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = QuoteServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=30)
+    # Python's json writes inf/nan as Infinity/NaN, which the server's json module also reads
+    connection.request("POST", "/quote", body if isinstance(body, str) else json.dumps(body))
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_valid_quote(server):
+    status, result = post(server, {"client_name": "Ada", "loads": [LOAD]})
+    assert status == 200
+    assert result["total_wh"] == 300
+    assert result["total_cost"] > 0
+
+
+@pytest.mark.parametrize("settings", [
+    {"backup_time": 1e999},
+    {"sun_hours": float("nan")},
+    {"battery_voltage": 0},
+    {"battery_voltage": 30},
+    {"sun_hours": 0},
+    {"dod_limit": 0},
+    {"system_efficiency": 0},
+    {"temperature_factor": 0},
+    {"current_electricity_rate": -1},
+    {"battery_type": ["x"]},
+])
+def test_invalid_settings_are_rejected(server, settings):
+    status, result = post(server, dict({"loads": [LOAD]}, **settings))
+    assert status == 400
+    assert "error" in result
+
+
+@pytest.mark.parametrize("load", [
+    {"quantity": 1e999},
+    {"quantity": "NaN"},
+    {"watt": "NaN"},
+    {"watt": -5},
+    {"hours": float("inf")},
+    {"appliance": ["x"]},
+])
+def test_invalid_loads_are_rejected(server, load):
+    status, result = post(server, {"loads": [dict(LOAD, **load)]})
+    assert status == 400
+    assert "error" in result
+
+
+def test_bad_request_does_not_fail_its_batch(server):
+    bodies = [{"loads": [LOAD]}, {"loads": [LOAD], "battery_type": ["x"]}, {"loads": [LOAD]}]
+    results = [None] * len(bodies)
+
+    def send(i):
+        results[i] = post(server, bodies[i])[0]
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(len(bodies))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [200, 400, 200]
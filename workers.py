@@ -0,0 +1,41 @@
+import contextlib
+import multiprocessing.context
+import sys
+import threading
+import types
+
+# Process pools started from inside the Streamlit app. A "spawn" worker
+# normally re-runs the parent's __main__ before taking any work, and under
+# `streamlit run` __main__ is the app script, so every worker would execute the
+# whole page without a session. Workers started through spawn_context get an
+# empty __main__ instead and only import the modules their tasks need.
+
+_launch_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _bare_main():
+    with _launch_lock:
+        main = sys.modules["__main__"]
+        bare = sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            # A script run starting meanwhile installs its own __main__; leave that one in place
+            if sys.modules["__main__"] is bare:
+                sys.modules["__main__"] = main
+
+
+class _SpawnProcess(multiprocessing.context.SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        # The child's start-up data (including which __main__ to re-run) is captured while launching
+        with _bare_main():
+            return multiprocessing.context.SpawnProcess._Popen(process_obj)
+
+
+class _SpawnContext(multiprocessing.context.SpawnContext):
+    Process = _SpawnProcess
+
+
+spawn_context = _SpawnContext()